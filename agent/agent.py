@@ -59,6 +59,13 @@ class MonitoringAgent:
             log_config = self.config.get_section("logging")
             log_level = getattr(logging, log_config.get("level", "INFO").upper())
 
+            # Under the service wrapper the root logger is already configured;
+            # adding our own handlers would write every record twice
+            root_logger = logging.getLogger()
+            if root_logger.handlers:
+                root_logger.setLevel(log_level)
+                return
+
             # Create logs directory
             log_dir = Path(__file__).parent / "logs"
             log_dir.mkdir(exist_ok=True)
@@ -86,7 +93,6 @@ class MonitoringAgent:
             console_handler.setFormatter(formatter)
 
             # Configure root logger
-            root_logger = logging.getLogger()
             root_logger.setLevel(log_level)
             root_logger.addHandler(file_handler)
             root_logger.addHandler(console_handler)
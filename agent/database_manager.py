@@ -257,6 +257,32 @@ class DatabaseManager:
             logging.error(f"Error marking record as sent: {e}")
             return False
             
+    def mark_many_as_sent(self, table_name: str, record_ids: List[int]) -> bool:
+        """Mark a batch of records as successfully sent to server"""
+        if not record_ids:
+            return True
+            
+        try:
+            with self._lock:
+                conn = self._get_connection()
+                try:
+                    placeholders = ','.join('?' * len(record_ids))
+                    cursor = conn.execute(f'''
+                        UPDATE {table_name} 
+                        SET sent_to_server = TRUE 
+                        WHERE id IN ({placeholders})
+                    ''', record_ids)
+                    
+                    logging.debug(f"Marked {cursor.rowcount} {table_name} records as sent")
+                    return cursor.rowcount > 0
+                        
+                finally:
+                    conn.close()
+                    
+        except Exception as e:
+            logging.error(f"Error marking records as sent: {e}")
+            return False
+            
     def record_sync_attempt(self, table_name: str, record_id: int, error: Optional[str] = None) -> None:
         """Record synchronization attempt for monitoring"""
         try:
@@ -8,8 +8,8 @@ import requests
 import logging
 import time
 import socket
-from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
 import json
 from urllib.parse import urljoin
 
@@ -125,6 +125,14 @@ class NetworkManager:
             method='POST'
         )
         
+    def send_heartbeat_batch(self, heartbeats: List[Dict[str, Any]]) -> Tuple[bool, str]:
+        """Send queued heartbeats to server in a single request"""
+        return self._send_with_retry(
+            endpoint='/api/heartbeat/batch',
+            data=heartbeats,
+            method='POST'
+        )
+        
     def send_detailed_log(self, username: str, hostname: str, employee_info: Dict[str, str],
                          activity_data: Dict[str, Any], screenshot_path: Optional[str] = None) -> Tuple[bool, str]:
         """Send detailed activity log to server with screenshot"""
@@ -306,29 +314,39 @@ class NetworkManager:
         }
         
         try:
-            # Sync heartbeats
+            # Sync heartbeats in one request; local timestamps are converted to UTC
+            # so the server keeps the time each heartbeat was actually taken
             heartbeats = self.db.get_unsent_heartbeats()
-            for heartbeat in heartbeats:
-                (hb_id, timestamp, hb_username, hb_hostname, employee_id, employee_email, 
-                 employee_name, department, manager, status, location_data) = heartbeat
-                
-                employee_info = {
-                    'employee_id': employee_id or '',
-                    'employee_email': employee_email or '',
-                    'employee_name': employee_name or '',
-                    'department': department or '',
-                    'manager': manager or ''
-                }
-                
-                success, message = self.send_heartbeat(hb_username, hb_hostname, employee_info, status)
+            if heartbeats:
+                batch = []
+                for heartbeat in heartbeats:
+                    (hb_id, timestamp, hb_username, hb_hostname, employee_id, employee_email, 
+                     employee_name, department, manager, status, location_data) = heartbeat
+                    
+                    batch.append({
+                        'username': hb_username,
+                        'hostname': hb_hostname,
+                        'employee_id': employee_id or '',
+                        'employee_email': employee_email or '',
+                        'employee_name': employee_name or '',
+                        'department': department or '',
+                        'manager': manager or '',
+                        'status': status,
+                        'timestamp': datetime.fromisoformat(timestamp).astimezone(timezone.utc)
+                                             .replace(tzinfo=None).isoformat()
+                    })
+                    
+                hb_ids = [heartbeat[0] for heartbeat in heartbeats]
+                success, message = self.send_heartbeat_batch(batch)
                 
                 if success:
-                    self.db.mark_as_sent('heartbeats', hb_id)
-                    sync_results['heartbeats_sent'] += 1
+                    self.db.mark_many_as_sent('heartbeats', hb_ids)
+                    sync_results['heartbeats_sent'] += len(hb_ids)
                 else:
-                    self.db.record_sync_attempt('heartbeats', hb_id, message)
-                    sync_results['heartbeats_failed'] += 1
-                    sync_results['errors'].append(f"Heartbeat {hb_id}: {message}")
+                    for hb_id in hb_ids:
+                        self.db.record_sync_attempt('heartbeats', hb_id, message)
+                    sync_results['heartbeats_failed'] += len(hb_ids)
+                    sync_results['errors'].append(f"Heartbeat batch of {len(hb_ids)}: {message}")
                     
             # Sync activity data
             activity_logs = self.db.get_unsent_activity_data()
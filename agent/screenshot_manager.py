@@ -9,7 +9,7 @@ import logging
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Tuple
-from PIL import ImageGrab, Image
+from PIL import ImageGrab, Image, features
 import time
 
 class ScreenshotManager:
@@ -22,6 +22,13 @@ class ScreenshotManager:
         self.screenshots_dir = Path(__file__).parent / 'screenshots'
         self.screenshots_dir.mkdir(exist_ok=True)
         
+        # WebP is about a third smaller than JPEG at the same quality, and the
+        # server stores it as sent instead of re-encoding
+        if features.check('webp'):
+            self.image_format, self.extension = 'WEBP', 'webp'
+        else:
+            self.image_format, self.extension = 'JPEG', 'jpg'
+
         # Quality settings for different size requirements
         self.quality_settings = [
             {'quality': 85, 'scale': 1.0},    # High quality, full size
@@ -94,17 +101,11 @@ class ScreenshotManager:
             # Prepare filename
             quality = settings['quality']
             scale_percent = int(settings['scale'] * 100)
-            filename = f"{base_filename}_q{quality}_s{scale_percent}.jpg"
+            filename = f"{base_filename}_q{quality}_s{scale_percent}.{self.extension}"
             filepath = self.screenshots_dir / filename
             
             # Save with specified quality
-            screenshot.save(
-                filepath, 
-                'JPEG', 
-                quality=quality,
-                optimize=True,
-                progressive=True
-            )
+            self._save_image(screenshot, filepath, quality)
             
             return str(filepath)
             
@@ -112,6 +113,13 @@ class ScreenshotManager:
             logging.error(f"Error saving screenshot with settings {settings}: {e}")
             return None
             
+    def _save_image(self, screenshot: Image.Image, filepath: Path, quality: int):
+        """Encode the screenshot in the agent's image format"""
+        if self.image_format == 'WEBP':
+            screenshot.save(filepath, 'WEBP', quality=quality, method=4)
+        else:
+            screenshot.save(filepath, 'JPEG', quality=quality, optimize=True, progressive=True)
+            
     def _save_minimal_screenshot(self, screenshot: Image.Image, base_filename: str) -> Optional[str]:
         """Save a very small screenshot as last resort"""
         try:
@@ -119,15 +127,10 @@ class ScreenshotManager:
             small_size = (320, 240)  # Very small size
             screenshot = screenshot.resize(small_size, Image.Resampling.LANCZOS)
             
-            filename = f"{base_filename}_minimal.jpg"
+            filename = f"{base_filename}_minimal.{self.extension}"
             filepath = self.screenshots_dir / filename
             
-            screenshot.save(
-                filepath, 
-                'JPEG', 
-                quality=30,
-                optimize=True
-            )
+            self._save_image(screenshot, filepath, 30)
             
             if self._check_file_size(filepath):
                 logging.info(f"Minimal screenshot saved: {filename}")
@@ -160,7 +163,7 @@ class ScreenshotManager:
             deleted_count = 0
             
             for filepath in self.screenshots_dir.iterdir():
-                if filepath.is_file() and filepath.suffix.lower() in ['.jpg', '.jpeg', '.png']:
+                if filepath.is_file() and filepath.suffix.lower() in ['.jpg', '.jpeg', '.png', '.webp']:
                     try:
                         if filepath.stat().st_mtime < cutoff_time:
                             filepath.unlink()
@@ -191,7 +194,7 @@ class ScreenshotManager:
             files_info = []
             
             for filepath in self.screenshots_dir.iterdir():
-                if filepath.is_file() and filepath.suffix.lower() in ['.jpg', '.jpeg', '.png']:
+                if filepath.is_file() and filepath.suffix.lower() in ['.jpg', '.jpeg', '.png', '.webp']:
                     try:
                         stat = filepath.stat()
                         size_mb = stat.st_size / (1024 * 1024)
@@ -9,7 +9,89 @@ import sys
 import time
 import logging
 import os
+import gzip
+import queue
+import atexit
+import shutil
+import threading
 from pathlib import Path
+from logging.handlers import RotatingFileHandler
+
+_log_listener = None
+_log_flush_stop = None
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+def _gzip_rotator(source, dest):
+    """Compress a rolled-over log file (runs on the listener thread)"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb', compresslevel=1) as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler with a 128KB write buffer, flushed at most every 2s"""
+    buffer_size = 128 * 1024
+    flush_interval = 2.0
+
+    def _open(self):
+        self._last_flush = time.monotonic()
+        self._size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+        return open(self.baseFilename, self.mode, encoding=self.encoding,
+                    errors=self.errors, buffering=self.buffer_size)
+
+    def shouldRollover(self, record):
+        # Track the file size ourselves; seek/tell on the stream would flush the buffer
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0:
+            size = len(self.format(record)) + 1
+            if self._size + size >= self.maxBytes:
+                return True
+            self._size += size
+        return False
+
+    def flush(self):
+        if self.stream and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.force_flush()
+
+    def force_flush(self):
+        self.acquire()
+        try:
+            if self.stream:
+                self.stream.flush()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+def _periodic_flush(handler, stop_event):
+    """Flush buffered log lines that would otherwise wait for the next record"""
+    while not stop_event.wait(handler.flush_interval):
+        handler.force_flush()
+
+def _stop_log_listener():
+    """Drain queued records and stop the background logging threads"""
+    global _log_listener, _log_flush_stop
+    if _log_flush_stop is not None:
+        _log_flush_stop.set()
+        _log_flush_stop = None
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+atexit.register(_stop_log_listener)
+
+def _ensure_logging(log_file):
+    """Plain file and console logging when the queued setup is unavailable"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(log_file, encoding='utf-8'),
+                logging.StreamHandler(sys.stdout)
+            ]
+        )
 
 def setup_service_logging():
     """Setup logging specifically for service mode"""
@@ -19,15 +101,26 @@ def setup_service_logging():
     log_file = log_dir / "service.log"
     
     # Configure logging with rotation
+    global _log_listener, _log_flush_stop
+    
+    # Re-initialising must not stack a second set of handlers on the root
+    _stop_log_listener()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+    
     try:
-        from logging.handlers import RotatingFileHandler
+        from logging.handlers import QueueHandler, QueueListener
         
-        file_handler = RotatingFileHandler(
+        file_handler = BufferedRotatingFileHandler(
             log_file,
             maxBytes=10 * 1024 * 1024,  # 10MB
             backupCount=5,
             encoding='utf-8'
         )
+        file_handler.namer = _gzip_namer
+        file_handler.rotator = _gzip_rotator
         
         console_handler = logging.StreamHandler(sys.stdout)
         
@@ -38,35 +131,81 @@ def setup_service_logging():
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
+        # Callers only enqueue records; writes, rollover and compression
+        # happen on the listener thread
+        log_queue = queue.Queue(-1)
+        _log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _log_listener.start()
+        
+        _log_flush_stop = threading.Event()
+        threading.Thread(target=_periodic_flush, args=(file_handler, _log_flush_stop),
+                         name="log-flush", daemon=True).start()
+        
         # Configure root logger
-        root_logger = logging.getLogger()
         root_logger.setLevel(logging.INFO)
-        root_logger.addHandler(file_handler)
-        root_logger.addHandler(console_handler)
+        root_logger.addHandler(QueueHandler(log_queue))
         
-    except ImportError:
-        # Fallback for systems without RotatingFileHandler
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
+    except Exception as e:
+        _stop_log_listener()
+        _ensure_logging(log_file)
+        logging.error(f"Failed to setup queued service logging, using basic: {e}")
+
+class CircuitBreaker:
+    """Stops restarting the agent against a server that keeps failing"""
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, cooldown=600):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+
+def _server_healthy():
+    """Single cheap probe used before leaving the open state"""
+    server_url = os.getenv("WFH_SERVER_URL")
+    if not server_url:
+        return True
+    try:
+        import requests
+        return requests.get(f"{server_url.rstrip('/')}/health", timeout=3).status_code == 200
+    except Exception:
+        return False
 
 def run_as_service():
     """Run the agent in service mode with proper error handling and recovery"""
     setup_service_logging()
     
-    restart_count = 0
-    max_restarts = 10
-    restart_delay = 30
+    breaker = CircuitBreaker()
+    attempt = 0
+    base_delay = 30
+    restart_delay = base_delay
+    started_at = time.monotonic()
     
-    while restart_count < max_restarts:
+    while True:
         try:
+            if breaker.state == breaker.OPEN:
+                logging.warning("Circuit open after %d consecutive failures, retrying in %d seconds",
+                                breaker.failures, breaker.cooldown)
+                time.sleep(breaker.cooldown)
+                breaker.state = breaker.HALF_OPEN
+                if not _server_healthy():
+                    logging.warning("Server health probe failed, keeping circuit open")
+                    breaker.record_failure()
+                    continue
+                    
+            attempt += 1
+            started_at = time.monotonic()
             logging.info("=" * 60)
-            logging.info(f"Starting WFH Monitoring Agent Service (attempt {restart_count + 1})")
+            logging.info(f"Starting WFH Monitoring Agent Service (attempt {attempt})")
             logging.info("=" * 60)
             
             # Import the modular agent
@@ -91,7 +230,7 @@ def run_as_service():
                 break  # Graceful shutdown, don't restart
             else:
                 logging.error("Agent failed to start properly")
-                restart_count += 1
+                breaker.record_failure()
                 
         except KeyboardInterrupt:
             logging.info("Service stopped by user (Ctrl+C)")
@@ -104,22 +243,25 @@ def run_as_service():
             break  # Don't restart for import errors
             
         except Exception as e:
-            restart_count += 1
-            logging.error(f"Service error (attempt {restart_count}/{max_restarts}): {e}")
-            
-            import traceback
-            logging.error(f"Full traceback:\n{traceback.format_exc()}")
+            # A run that stayed up past the cool-down counts as a recovery
+            if time.monotonic() - started_at >= breaker.cooldown:
+                breaker.record_success()
+                restart_delay = base_delay
+            breaker.record_failure()
+            logging.exception("Service error (attempt %d, %d consecutive failures): %s",
+                              attempt, breaker.failures, e)
             
-            if restart_count < max_restarts:
+        if breaker.state == breaker.CLOSED:
+            try:
                 logging.info(f"Restarting service in {restart_delay} seconds...")
                 time.sleep(restart_delay)
-                
-                # Increase delay for subsequent restarts (exponential backoff)
-                restart_delay = min(300, restart_delay * 1.5)  # Max 5 minutes
-            else:
-                logging.error(f"Maximum restart attempts ({max_restarts}) reached, stopping service")
+            except KeyboardInterrupt:
+                logging.info("Service stopped by user (Ctrl+C)")
                 break
                 
+            # Increase delay for subsequent restarts (exponential backoff)
+            restart_delay = min(300, restart_delay * 1.5)  # Max 5 minutes
+                
     logging.info("Service wrapper exiting")
 
 def main():
@@ -0,0 +1,32 @@
+import axios, { AxiosRequestConfig, AxiosResponse } from 'axios';
+
+// Short-lived promise cache so switching sections or re-opening a view doesn't repeat identical requests
+const apiCache = new Map<string, { ts: number; promise: Promise<any> }>();
+
+export const cachedCall = <T>(key: string, ttlMs: number, fetcher: () => Promise<T>): Promise<T> => {
+  const entry = apiCache.get(key);
+  if (entry && Date.now() - entry.ts < ttlMs) {
+    return entry.promise;
+  }
+
+  const promise = fetcher();
+  apiCache.set(key, { ts: Date.now(), promise });
+  // Don't keep failures around for the rest of the TTL
+  promise.catch(() => {
+    if (apiCache.get(key)?.promise === promise) {
+      apiCache.delete(key);
+    }
+  });
+  return promise;
+};
+
+export const cachedGet = (url: string, ttlMs: number, config?: AxiosRequestConfig): Promise<AxiosResponse> =>
+  cachedCall(url, ttlMs, () => axios.get(url, config));
+
+export const invalidateApiCache = (key: string) => {
+  apiCache.delete(key);
+};
+
+export const clearApiCache = () => {
+  apiCache.clear();
+};
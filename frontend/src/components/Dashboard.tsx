@@ -11,6 +11,14 @@ import SettingsSection from './sections/SettingsSection';
 
 type Section = 'dashboard' | 'employees' | 'reports' | 'agent' | 'settings';
 
+const SECTION_TITLES: Record<Section, string> = {
+  dashboard: 'Dashboard',
+  employees: 'Employee Management',
+  reports: 'Reports & Analytics',
+  agent: 'Agent Download',
+  settings: 'System Settings'
+};
+
 const Dashboard: React.FC = () => {
   const [currentSection, setCurrentSection] = useState<Section>('dashboard');
   const { logout } = useAuth();
@@ -32,22 +40,11 @@ const Dashboard: React.FC = () => {
     }
   };
 
-  const getSectionTitle = () => {
-    const titles = {
-      dashboard: 'Dashboard',
-      employees: 'Employee Management',
-      reports: 'Reports & Analytics',
-      agent: 'Agent Download',
-      settings: 'System Settings'
-    };
-    return titles[currentSection];
-  };
-
   return (
     <div className="dashboard">
       <Sidebar currentSection={currentSection} onSectionChange={setCurrentSection} />
       <div className="main-content">
-        <Header title={getSectionTitle()} onLogout={logout} />
+        <Header title={SECTION_TITLES[currentSection]} onLogout={logout} />
         <div className="content-section active">
           {renderSection()}
         </div>
@@ -13,20 +13,9 @@ const AgentSection: React.FC = () => {
         return;
       }
 
-      const response = await axios.get(`/api/download/agent/${platform}`, {
-        responseType: 'blob'
-      });
-      
-      const url = window.URL.createObjectURL(new Blob([response.data]));
-      const link = document.createElement('a');
-      link.href = url;
-      link.setAttribute('download', `wfh-agent-${platform}.zip`);
-      document.body.appendChild(link);
-      link.click();
-      link.remove();
-      window.URL.revokeObjectURL(url);
-      
-      alert(`Agent for ${platform} downloaded successfully!`);
+      // A one-shot token lets the browser stream the zip straight to disk instead of buffering a blob
+      const response = await axios.post('/api/admin/download-token');
+      window.location.href = `/api/download/agent/${platform}?token=${encodeURIComponent(response.data.token)}`;
     } catch (error) {
       console.error('Download error:', error);
       alert('Download failed: ' + (error as any).message);
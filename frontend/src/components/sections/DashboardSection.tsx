@@ -1,6 +1,14 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../../contexts/AuthContext';
+import { cachedGet, invalidateApiCache } from '../../apiCache';
+import { formatDateTime } from '../../formatDate';
+
+const REFRESH_INTERVAL_MS = 30000;
+const REFRESH_JITTER_MS = 5000;
+const LIVE_RECONNECT_MS = 10000;
+// Pushes only carry status changes, so "last seen" times still need an occasional refresh
+const LIVE_REFRESH_INTERVAL_MS = 120000;
+const STATS_URL = '/api/admin/employees/stats';
 
 interface Employee {
   username: string;
@@ -13,21 +21,127 @@ interface Employee {
   country: string;
 }
 
+interface StatusUpdate {
+  type: 'status';
+  username: string;
+  status: string;
+  last_seen: string;
+  total: number;
+  online: number;
+}
+
+interface EmployeeStats {
+  total: number;
+  online: number;
+  offline: number;
+  recent: Employee[];
+}
+
 const DashboardSection: React.FC = () => {
-  const [employees, setEmployees] = useState<Employee[]>([]);
+  const [stats, setStats] = useState<EmployeeStats>({ total: 0, online: 0, offline: 0, recent: [] });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
-  const { logout, isAuthenticated, isInitialized } = useAuth();
+  const { token: authToken, logout, isAuthenticated, isInitialized } = useAuth();
+  const inFlight = useRef(false);
+  const liveConnected = useRef(false);
+  const lastLoadedAt = useRef(0);
+  const freshPending = useRef(false);
+  const statsRef = useRef(stats);
+  statsRef.current = stats;
 
   useEffect(() => {
-    if (isInitialized && isAuthenticated) {
-      loadDashboardData();
-      const interval = setInterval(loadDashboardData, 30000);
-      return () => clearInterval(interval);
-    }
+    if (!isInitialized || !isAuthenticated) return;
+
+    // Poll only while the tab is visible; jitter keeps open dashboards out of lockstep
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    // While live updates flow, only the slow refresh for "last seen" is due
+    const refreshDue = () =>
+      !liveConnected.current || Date.now() - lastLoadedAt.current >= LIVE_REFRESH_INTERVAL_MS;
+    const scheduleNext = () => {
+      clearTimeout(timer);
+      timer = setTimeout(async () => {
+        if (document.visibilityState === 'visible') {
+          if (refreshDue()) {
+            await loadDashboardData();
+          }
+          scheduleNext();
+        }
+      }, REFRESH_INTERVAL_MS + Math.random() * REFRESH_JITTER_MS);
+    };
+    const handleVisibilityChange = () => {
+      if (document.visibilityState === 'visible') {
+        if (refreshDue()) {
+          loadDashboardData();
+        }
+        scheduleNext();
+      } else {
+        clearTimeout(timer);
+      }
+    };
+
+    loadDashboardData();
+    scheduleNext();
+    document.addEventListener('visibilitychange', handleVisibilityChange);
+    return () => {
+      clearTimeout(timer);
+      document.removeEventListener('visibilitychange', handleVisibilityChange);
+    };
   }, [isInitialized, isAuthenticated]);
 
-  const loadDashboardData = async () => {
+  // Status changes pushed by the server; reconnects after a drop, polling covers the gap
+  useEffect(() => {
+    if (!isInitialized || !isAuthenticated || !authToken) return;
+
+    let socket: WebSocket | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+    const connect = () => {
+      const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+      socket = new WebSocket(`${protocol}//${window.location.host}/ws/admin/employees?token=${encodeURIComponent(authToken)}`);
+      socket.onopen = () => {
+        liveConnected.current = true;
+      };
+      socket.onmessage = (event) => applyStatusUpdate(JSON.parse(event.data));
+      socket.onclose = () => {
+        liveConnected.current = false;
+        if (!closed) {
+          retryTimer = setTimeout(connect, LIVE_RECONNECT_MS);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket?.close();
+    };
+  }, [isInitialized, isAuthenticated, authToken]);
+
+  const applyStatusUpdate = (update: StatusUpdate) => {
+    if (update.type !== 'status') return;
+    // Someone outside the recent panel came online; fetch their row, bypassing
+    // the cached stats this push has just made stale
+    if (!statsRef.current.recent.some(emp => emp.username === update.username)) {
+      loadDashboardData(true);
+    }
+    setStats(prev => ({
+      total: update.total,
+      online: update.online,
+      offline: update.total - update.online,
+      recent: prev.recent.map(emp => emp.username === update.username
+        ? { ...emp, status: update.status, last_seen: update.last_seen }
+        : emp)
+    }));
+  };
+
+  const loadDashboardData = async (fresh = false) => {
+    if (inFlight.current) {
+      // The response in flight may predate a push; fetch again once it lands
+      freshPending.current = freshPending.current || fresh;
+      return;
+    }
+    inFlight.current = true;
     try {
       setError(null);
       const token = localStorage.getItem('token');
@@ -37,13 +151,19 @@ const DashboardSection: React.FC = () => {
         return;
       }
       
-      const response = await axios.get('/api/admin/employees/status', {
+      if (fresh) {
+        invalidateApiCache(STATS_URL);
+      }
+      const response = await cachedGet(STATS_URL, 10000, {
         headers: {
-          'Authorization': `Bearer ${token}`
+          'Authorization': `Bearer ${token}`,
+          // Also skip the browser's copy (the server allows max-age=5)
+          ...(fresh ? { 'Cache-Control': 'no-cache' } : {})
         },
         timeout: 10000 // 10 second timeout
       });
-      setEmployees(response.data.employees || []);
+      setStats(response.data);
+      lastLoadedAt.current = Date.now();
     } catch (error: any) {
       console.error('Failed to load dashboard data:', error);
       
@@ -65,16 +185,29 @@ const DashboardSection: React.FC = () => {
         setError(`Server error (${error.response?.status}): ${error.response?.data?.detail || 'Unknown error'}`);
       }
     } finally {
+      inFlight.current = false;
       setLoading(false);
+      if (freshPending.current) {
+        freshPending.current = false;
+        loadDashboardData(true);
+      }
     }
   };
 
   return (
     <div>
       {loading ? (
-        <div style={{ textAlign: 'center', padding: '40px' }}>
-          <div style={{ fontSize: '24px', marginBottom: '10px' }}>⏳</div>
-          <div>Loading dashboard data...</div>
+        // Placeholders in the final layout so the page doesn't jump when data lands
+        <div aria-busy="true" aria-label="Loading dashboard data">
+          <div className="stats-grid">
+            {[0, 1, 2, 3].map(i => (
+              <div key={i} className="skeleton skeleton-stat" />
+            ))}
+          </div>
+          <div className="skeleton skeleton-heading" />
+          {[0, 1, 2].map(i => (
+            <div key={i} className="skeleton skeleton-row" />
+          ))}
         </div>
       ) : error ? (
         <div style={{ textAlign: 'center', padding: '40px' }}>
@@ -89,7 +222,7 @@ const DashboardSection: React.FC = () => {
             <div>{error}</div>
           </div>
           <button
-            onClick={loadDashboardData}
+            onClick={() => loadDashboardData(true)}
             style={{
               background: '#007bff',
               color: 'white',
@@ -106,21 +239,21 @@ const DashboardSection: React.FC = () => {
         <>
           <div className="stats-grid">
             <div className="stat-card">
-              <h3>{employees.length}</h3>
+              <h3>{stats.total}</h3>
               <p>Total Employees</p>
             </div>
             <div className="stat-card">
-              <h3>{employees.filter(emp => emp.status === 'online').length}</h3>
+              <h3>{stats.online}</h3>
               <p>Online Now</p>
             </div>
             <div className="stat-card">
-              <h3>{employees.filter(emp => emp.status === 'offline').length}</h3>
+              <h3>{stats.offline}</h3>
               <p>Offline</p>
             </div>
             <div className="stat-card">
               <h3>
-                {employees.length > 0
-                  ? Math.round((employees.filter(emp => emp.status === 'online').length / employees.length) * 100)
+                {stats.total > 0
+                  ? Math.round((stats.online / stats.total) * 100)
                   : 0}%
               </h3>
               <p>Online Rate</p>
@@ -135,7 +268,7 @@ const DashboardSection: React.FC = () => {
           }}>
             <h3>Recent Employee Activity</h3>
             <button
-              onClick={loadDashboardData}
+              onClick={() => loadDashboardData(true)}
               style={{
                 background: '#28a745',
                 color: 'white',
@@ -150,7 +283,7 @@ const DashboardSection: React.FC = () => {
             </button>
           </div>
 
-          {employees.length === 0 ? (
+          {stats.recent.length === 0 ? (
             <div style={{
               textAlign: 'center',
               padding: '40px',
@@ -163,7 +296,7 @@ const DashboardSection: React.FC = () => {
             </div>
           ) : (
             <div className="employee-list">
-              {employees.map(emp => (
+              {stats.recent.map(emp => (
                 <div key={emp.username} className="employee-card">
                   <div className="employee-info">
                     <strong>{emp.username}</strong> ({emp.hostname})
@@ -175,7 +308,7 @@ const DashboardSection: React.FC = () => {
                   <div className={`status ${emp.status === 'online' ? 'status-online' : 'status-offline'}`}>
                     {emp.status === 'online' ? '🟢 Online' : '🔴 Offline'}
                     <br />
-                    <small>Last seen: {new Date(emp.last_seen).toLocaleString()}</small>
+                    <small>Last seen: {formatDateTime(emp.last_seen)}</small>
                   </div>
                 </div>
               ))}
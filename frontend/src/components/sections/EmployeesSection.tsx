@@ -1,6 +1,8 @@
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import axios from 'axios';
+import { cachedCall, cachedGet } from '../../apiCache';
+import { formatDate, formatDateTime, formatTime } from '../../formatDate';
 
 interface Employee {
   id: string;
@@ -23,8 +25,9 @@ interface LogEntry {
   hostname: string;
   local_ip: string;
   public_ip: string;
-  location: string;
+  location: { ip?: string; city?: string; region?: string; country?: string } | null;
   screenshot_path: string | null;
+  screenshot_url: string | null;
   activity_data: string;
 }
 
@@ -42,12 +45,19 @@ interface DayActivity {
   productivity: string;
 }
 
+// Position after the last loaded log; the server pages on (timestamp, id)
+interface LogsCursor {
+  before: string;
+  before_id: number;
+}
+
 interface ViewState {
   currentView: 'list' | 'employee-detail' | 'day-detail';
   selectedEmployee: string | null;
   selectedDate: string | null;
   employeeData: {
     logs: LogEntry[];
+    nextCursor: LogsCursor | null;
     stats: any;
     dailyActivities: DayActivity[];
   } | null;
@@ -61,11 +71,66 @@ interface DashboardStats {
   remote_productivity: number;
 }
 
+// Rows rendered up front and added each time the bottom sentinel scrolls into view
+const ROW_WINDOW = 50;
+const SEARCH_DEBOUNCE_MS = 300;
+const DETAIL_CACHE_TTL_MS = 60000;
+const LOGS_PAGE_SIZE = 100;
+const LOGS_DAYS = 30;
+
+// Memoized so a refresh only re-renders rows whose employee object changed
+const EmployeeRow = React.memo(({ emp, onSelect }: { emp: Employee; onSelect: (username: string) => void }) => (
+  <tr onClick={() => onSelect(emp.username)}
+      style={{ 
+        cursor: 'pointer',
+        backgroundColor: emp.status === 'online' ? '#f8f9fa' : '#fff'
+      }}
+      className="employee-row"
+  >
+    <td><strong>{emp.id}</strong></td>
+    <td>
+      <strong>{emp.username}</strong>
+      <div style={{ fontSize: '11px', color: '#666', marginTop: '2px' }}>
+        {emp.status === 'online' ? '🟢 Online' : '🔴 Offline'} • {emp.public_ip}
+      </div>
+      <div style={{ 
+        fontSize: '10px', 
+        color: emp.location === 'Office Bangalore' ? '#007bff' : '#28a745',
+        fontWeight: '500'
+      }}>
+        {emp.location === 'Office Bangalore' ? '🏢 Office Bangalore' : '🏠 Remote work'}
+      </div>
+    </td>
+    <td>
+      <span className={emp.start_time !== '--:--' ? 'time-active' : 'time-inactive'}>
+        {emp.start_time}
+      </span>
+    </td>
+    <td>
+      <span className={emp.end_time !== '--:--' ? 'time-active' : 'time-inactive'}>
+        {emp.end_time}
+      </span>
+    </td>
+    <td>
+      <span className={emp.raw_hours > 0 ? 'hours-active' : 'hours-inactive'}>
+        {emp.working_hours}
+      </span>
+    </td>
+    <td>
+      <span className={`productivity-${emp.raw_productivity >= 80 ? 'high' : emp.raw_productivity >= 60 ? 'medium' : 'low'}`}>
+        {emp.productivity}
+      </span>
+    </td>
+  </tr>
+));
+
 const EmployeesSection: React.FC = () => {
   const [employees, setEmployees] = useState<Employee[]>([]);
-  const [filteredEmployees, setFilteredEmployees] = useState<Employee[]>([]);
   const [dashboardStats, setDashboardStats] = useState<DashboardStats | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
+  const [visibleCount, setVisibleCount] = useState(ROW_WINDOW);
+  const [sentinel, setSentinel] = useState<HTMLTableRowElement | null>(null);
   const [statusFilter, setStatusFilter] = useState('');
   const [sortBy, setSortBy] = useState('name');
   const [viewState, setViewState] = useState<ViewState>({
@@ -75,18 +140,38 @@ const EmployeesSection: React.FC = () => {
     employeeData: null
   });
   const [loading, setLoading] = useState(false);
+  const [loadingOlderLogs, setLoadingOlderLogs] = useState(false);
+  // Screenshots that failed to load; rendered as a placeholder instead of patching the DOM
+  const [brokenScreenshots, setBrokenScreenshots] = useState<Set<string>>(new Set());
 
   useEffect(() => {
     loadEmployees();
   }, []);
 
   useEffect(() => {
-    filterAndSortEmployees();
-  }, [employees, searchTerm, statusFilter, sortBy]);
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  useEffect(() => {
+    setVisibleCount(ROW_WINDOW);
+  }, [debouncedSearch, statusFilter, sortBy]);
+
+  // Re-observed after every bump so a sentinel that is still on screen keeps loading rows
+  useEffect(() => {
+    if (!sentinel) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) {
+        setVisibleCount(count => count + ROW_WINDOW);
+      }
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [sentinel, visibleCount]);
 
   const loadEmployees = async () => {
     try {
-      const response = await axios.get('/api/admin/employees/enhanced');
+      const response = await cachedGet('/api/admin/employees/enhanced', 10000);
       setEmployees(response.data.employees || []);
       setDashboardStats(response.data.dashboard_stats || null);
     } catch (error) {
@@ -94,10 +179,10 @@ const EmployeesSection: React.FC = () => {
     }
   };
 
-  const filterAndSortEmployees = () => {
+  const filteredEmployees = useMemo(() => {
     let filtered = employees.filter(emp => {
-      const matchesSearch = emp.username.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                           emp.id.toLowerCase().includes(searchTerm.toLowerCase());
+      const matchesSearch = emp.username.toLowerCase().includes(debouncedSearch.toLowerCase()) ||
+                           emp.id.toLowerCase().includes(debouncedSearch.toLowerCase());
       const matchesStatus = !statusFilter || emp.status === statusFilter;
       return matchesSearch && matchesStatus;
     });
@@ -117,25 +202,40 @@ const EmployeesSection: React.FC = () => {
       }
     });
 
-    setFilteredEmployees(filtered);
+    return filtered;
+  }, [employees, debouncedSearch, statusFilter, sortBy]);
+
+  // One page of logs, newest first; older pages are fetched only when asked for.
+  // Each page is cached under its cursor, so re-opening an employee reuses only what was loaded.
+  const fetchLogsPage = (username: string, cursor: LogsCursor | null) => {
+    const pageKey = cursor ? `${cursor.before}:${cursor.before_id}` : 'first';
+    return cachedCall(`logs:${username}:${pageKey}`, DETAIL_CACHE_TTL_MS, async () => {
+      const params = { days: LOGS_DAYS, limit: LOGS_PAGE_SIZE, ...(cursor || {}) };
+      const response = await axios.get(`/api/admin/employees/${username}/logs`, { params });
+      const nextCursor: LogsCursor | null = response.data.next_before
+        ? { before: response.data.next_before, before_id: response.data.next_before_id }
+        : null;
+      return { logs: (response.data.logs || []) as LogEntry[], nextCursor };
+    });
   };
 
   const viewEmployeeDetail = async (username: string) => {
     setLoading(true);
     try {
-      // Get logs for the last 30 days to build calendar
-      const response = await axios.get(`/api/admin/employees/${username}/logs?days=30`);
+      // The newest page of the last 30 days builds the calendar
+      const { logs, nextCursor } = await fetchLogsPage(username, null);
       const employee = employees.find(emp => emp.username === username);
 
       // Process logs to create daily activities
-      const dailyActivities = await processDailyActivities(username, response.data.logs || []);
+      const dailyActivities = await processDailyActivities(username, logs);
 
       setViewState({
         currentView: 'employee-detail',
         selectedEmployee: username,
         selectedDate: null,
         employeeData: {
-          logs: response.data.logs || [],
+          logs,
+          nextCursor,
           stats: employee || {},
           dailyActivities
         }
@@ -148,6 +248,7 @@ const EmployeesSection: React.FC = () => {
         selectedDate: null,
         employeeData: {
           logs: [],
+          nextCursor: null,
           stats: employees.find(emp => emp.username === username) || {},
           dailyActivities: []
         }
@@ -156,6 +257,31 @@ const EmployeesSection: React.FC = () => {
     setLoading(false);
   };
 
+  const loadOlderLogs = async () => {
+    const { selectedEmployee: username, employeeData } = viewState;
+    if (!username || !employeeData?.nextCursor || loadingOlderLogs) return;
+    setLoadingOlderLogs(true);
+    try {
+      const page = await fetchLogsPage(username, employeeData.nextCursor);
+      const logs = [...employeeData.logs, ...page.logs];
+      const dailyActivities = await processDailyActivities(username, logs);
+      setViewState(prev => prev.selectedEmployee !== username || !prev.employeeData ? prev : {
+        ...prev,
+        employeeData: { ...prev.employeeData, logs, nextCursor: page.nextCursor, dailyActivities }
+      });
+    } catch (error) {
+      console.error('Error loading older logs:', error);
+    }
+    setLoadingOlderLogs(false);
+  };
+
+  // Stable click handler for the memoized rows; always calls the latest viewEmployeeDetail
+  const viewEmployeeDetailRef = useRef(viewEmployeeDetail);
+  viewEmployeeDetailRef.current = viewEmployeeDetail;
+  const selectEmployee = useCallback((username: string) => {
+    viewEmployeeDetailRef.current(username);
+  }, []);
+
   const processDailyActivities = async (username: string, logs: LogEntry[]): Promise<DayActivity[]> => {
     const dailyMap = new Map<string, DayActivity>();
 
@@ -182,12 +308,9 @@ const EmployeesSection: React.FC = () => {
       const dayActivity = dailyMap.get(date)!;
       
       // Determine location
-      try {
-        const locationData = JSON.parse(log.location);
-        if (locationData.ip === "14.96.131.106") {
-          dayActivity.location = 'Office Bangalore';
-        }
-      } catch (e) {}
+      if (log.location?.ip === "14.96.131.106") {
+        dayActivity.location = 'Office Bangalore';
+      }
 
       // Parse activity data
       try {
@@ -226,17 +349,17 @@ const EmployeesSection: React.FC = () => {
       }
     });
 
-    // Get working hours for each day
-    for (const [date, activity] of dailyMap.entries()) {
+    // Get working hours for each day; the per-day requests are independent, so issue them together
+    await Promise.all(Array.from(dailyMap.entries()).map(async ([date, activity]) => {
       try {
-        const workingHoursResponse = await axios.get(`/api/admin/employees/${username}/working-hours?date=${date}`);
+        const workingHoursResponse = await cachedGet(`/api/admin/employees/${username}/working-hours?date=${date}`, DETAIL_CACHE_TTL_MS);
         activity.working_hours = workingHoursResponse.data.total_hours || 0;
         const productivityPercentage = Math.min((activity.working_hours / 8.0 * 100), 100);
         activity.productivity = `${Math.round(productivityPercentage)}%`;
       } catch (e) {
         console.error('Error getting working hours for date:', date, e);
       }
-    }
+    }));
 
     return Array.from(dailyMap.values()).sort((a, b) => b.date.localeCompare(a.date));
   };
@@ -328,7 +451,7 @@ const EmployeesSection: React.FC = () => {
       <div className="day-detail-page">
         <div className="day-detail-header">
           <h1 className="day-detail-title">
-            📅 {viewState.selectedEmployee} - {new Date(viewState.selectedDate!).toLocaleDateString()}
+            📅 {viewState.selectedEmployee} - {formatDate(viewState.selectedDate!)}
           </h1>
           <button className="back-btn" onClick={backToEmployeeDetail}>
             ← Back to Calendar
@@ -405,7 +528,7 @@ const EmployeesSection: React.FC = () => {
                     <div className="website-info">
                       <span className="website-browser">{website.browser}</span>
                       <span className="website-url">{website.url}</span>
-                      <span className="website-time">{new Date(website.timestamp).toLocaleTimeString()}</span>
+                      <span className="website-time">{formatTime(website.timestamp)}</span>
                     </div>
                   </div>
                 ))
@@ -441,21 +564,19 @@ const EmployeesSection: React.FC = () => {
               {dayActivity.screenshots.map((screenshot, index) => (
                 <div key={index} className="screenshot-item">
                   <div className="screenshot-time">
-                    {new Date(screenshot.timestamp).toLocaleTimeString()}
+                    {formatTime(screenshot.timestamp)}
                   </div>
-                  {screenshot.screenshot_path ? (
+                  {screenshot.screenshot_url && brokenScreenshots.has(screenshot.screenshot_url) ? (
+                    <div className="screenshot-error">📷 Screenshot not available</div>
+                  ) : screenshot.screenshot_url ? (
                     <img 
-                      src={`/api/screenshots/${screenshot.screenshot_path.split('/').pop()}`}
+                      src={screenshot.screenshot_url}
                       alt="Screenshot"
                       className="screenshot-thumbnail"
-                      onClick={() => window.open(`/api/screenshots/${screenshot.screenshot_path.split('/').pop()}`, '_blank')}
-                      onError={(e) => {
-                        const target = e.target as HTMLImageElement;
-                        target.style.display = 'none';
-                        const container = target.parentElement;
-                        if (container) {
-                          container.innerHTML = '<div class="screenshot-error">📷 Screenshot not available</div>';
-                        }
+                      onClick={() => window.open(screenshot.screenshot_url!, '_blank')}
+                      onError={() => {
+                        const url = screenshot.screenshot_url!;
+                        setBrokenScreenshots(prev => new Set(prev).add(url));
                       }}
                     />
                   ) : (
@@ -473,7 +594,7 @@ const EmployeesSection: React.FC = () => {
   const renderCalendarView = () => {
     if (!viewState.employeeData) return null;
 
-    const { dailyActivities } = viewState.employeeData;
+    const { dailyActivities, nextCursor } = viewState.employeeData;
     
     // Generate calendar for last 30 days
     const today = new Date();
@@ -518,6 +639,11 @@ const EmployeesSection: React.FC = () => {
             </div>
           ))}
         </div>
+        {nextCursor && (
+          <button className="back-btn" onClick={loadOlderLogs} disabled={loadingOlderLogs}>
+            {loadingOlderLogs ? 'Loading…' : 'Load older activity'}
+          </button>
+        )}
         <div className="calendar-legend">
           <div className="legend-item">
             <span className="legend-dot office"></span>
@@ -579,7 +705,7 @@ const EmployeesSection: React.FC = () => {
             <div className="stat-card">
               <h4>Last Seen</h4>
               <p className="stat-value" style={{ fontSize: '16px' }}>
-                {employee.last_seen ? new Date(employee.last_seen).toLocaleString() : 'Unknown'}
+                {employee.last_seen ? formatDateTime(employee.last_seen) : 'Unknown'}
               </p>
             </div>
           </div>
@@ -687,51 +813,14 @@ const EmployeesSection: React.FC = () => {
                 </tr>
               </thead>
               <tbody>
-                {filteredEmployees.map((emp) => (
-                  <tr key={emp.id} 
-                      onClick={() => viewEmployeeDetail(emp.username)}
-                      style={{ 
-                        cursor: 'pointer',
-                        backgroundColor: emp.status === 'online' ? '#f8f9fa' : '#fff'
-                      }}
-                      className="employee-row"
-                  >
-                    <td><strong>{emp.id}</strong></td>
-                    <td>
-                      <strong>{emp.username}</strong>
-                      <div style={{ fontSize: '11px', color: '#666', marginTop: '2px' }}>
-                        {emp.status === 'online' ? '🟢 Online' : '🔴 Offline'} • {emp.public_ip}
-                      </div>
-                      <div style={{ 
-                        fontSize: '10px', 
-                        color: emp.location === 'Office Bangalore' ? '#007bff' : '#28a745',
-                        fontWeight: '500'
-                      }}>
-                        {emp.location === 'Office Bangalore' ? '🏢 Office Bangalore' : '🏠 Remote work'}
-                      </div>
-                    </td>
-                    <td>
-                      <span className={emp.start_time !== '--:--' ? 'time-active' : 'time-inactive'}>
-                        {emp.start_time}
-                      </span>
-                    </td>
-                    <td>
-                      <span className={emp.end_time !== '--:--' ? 'time-active' : 'time-inactive'}>
-                        {emp.end_time}
-                      </span>
-                    </td>
-                    <td>
-                      <span className={emp.raw_hours > 0 ? 'hours-active' : 'hours-inactive'}>
-                        {emp.working_hours}
-                      </span>
-                    </td>
-                    <td>
-                      <span className={`productivity-${emp.raw_productivity >= 80 ? 'high' : emp.raw_productivity >= 60 ? 'medium' : 'low'}`}>
-                        {emp.productivity}
-                      </span>
-                    </td>
-                  </tr>
+                {filteredEmployees.slice(0, visibleCount).map((emp) => (
+                  <EmployeeRow key={emp.id} emp={emp} onSelect={selectEmployee} />
                 ))}
+                {visibleCount < filteredEmployees.length && (
+                  <tr ref={setSentinel}>
+                    <td colSpan={6} style={{ textAlign: 'center', color: '#666' }}>Loading more...</td>
+                  </tr>
+                )}
               </tbody>
             </table>
           ) : (
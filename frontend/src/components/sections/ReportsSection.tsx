@@ -1,16 +1,37 @@
 
-import React, { useState } from 'react';
+import React, { useState, useRef } from 'react';
 import axios from 'axios';
+import { formatDateTime, formatTime } from '../../formatDate';
+
+// Quote fields with separators (formatted dates contain commas) and keep
+// usernames starting with =, +, - or @ from being read as spreadsheet formulas
+const CSV_QUOTE_RE = /[",\r\n]/;
+const CSV_FORMULA_RE = /^[=+\-@]/;
+
+const csvField = (value: unknown): string => {
+  if (value === null || value === undefined) return '';
+  if (typeof value === 'number') return String(value);
+  let text = String(value);
+  if (CSV_FORMULA_RE.test(text)) {
+    text = `'${text}`;
+  }
+  return CSV_QUOTE_RE.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+};
 
 const ReportsSection: React.FC = () => {
   const [currentTab, setCurrentTab] = useState('daily');
   const [reportData, setReportData] = useState<any>(null);
   const [loading, setLoading] = useState(false);
+  // Date inputs are read through refs rather than looked up by id on every click
+  const dailyDateRef = useRef<HTMLInputElement>(null);
+  const weeklyDateRef = useRef<HTMLInputElement>(null);
+  const customFromRef = useRef<HTMLInputElement>(null);
+  const customToRef = useRef<HTMLInputElement>(null);
 
   const loadDailyReport = async () => {
     setLoading(true);
     try {
-      const date = (document.getElementById('dailyDate') as HTMLInputElement)?.value || 
+      const date = dailyDateRef.current?.value || 
                    new Date().toISOString().split('T')[0];
       const response = await axios.get(`/api/admin/reports/daily?date=${date}`);
       setReportData(response.data);
@@ -24,7 +45,7 @@ const ReportsSection: React.FC = () => {
   const loadWeeklyReport = async () => {
     setLoading(true);
     try {
-      const startDate = (document.getElementById('weeklyDate') as HTMLInputElement)?.value || 
+      const startDate = weeklyDateRef.current?.value || 
                         getWeekStart().toISOString().split('T')[0];
       const response = await axios.get(`/api/admin/reports/weekly?start_date=${startDate}`);
       setReportData(response.data);
@@ -38,8 +59,8 @@ const ReportsSection: React.FC = () => {
   const loadCustomReport = async () => {
     setLoading(true);
     try {
-      const startDate = (document.getElementById('customFromDate') as HTMLInputElement)?.value;
-      const endDate = (document.getElementById('customToDate') as HTMLInputElement)?.value;
+      const startDate = customFromRef.current?.value;
+      const endDate = customToRef.current?.value;
       
       if (!startDate || !endDate) {
         alert('Please select both start and end dates');
@@ -69,26 +90,26 @@ const ReportsSection: React.FC = () => {
       return;
     }
 
-    let csvContent = '';
-    
+    const rows: unknown[][] = [];
+
     if (currentTab === 'daily') {
-      csvContent = 'Employee,Hours Worked,First Activity,Last Activity,Heartbeats,Logs\n';
+      rows.push(['Employee', 'Hours Worked', 'First Activity', 'Last Activity', 'Heartbeats', 'Logs']);
       data.employees.forEach((emp: any) => {
-        csvContent += `${emp.username},${emp.hours_worked},${new Date(emp.first_activity).toLocaleString()},${new Date(emp.last_activity).toLocaleString()},${emp.heartbeats_count},${emp.logs_count}\n`;
+        rows.push([emp.username, emp.hours_worked, formatDateTime(emp.first_activity), formatDateTime(emp.last_activity), emp.heartbeats_count, emp.logs_count]);
       });
     } else if (currentTab === 'weekly') {
-      csvContent = 'Employee,Total Hours,Avg Daily Hours,Mon,Tue,Wed,Thu,Fri,Sat,Sun\n';
+      rows.push(['Employee', 'Total Hours', 'Avg Daily Hours', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']);
       data.employees.forEach((emp: any) => {
-        const dailyHours = emp.daily_breakdown.map((day: any) => day.hours_worked).join(',');
-        csvContent += `${emp.username},${emp.total_hours},${emp.average_daily_hours},${dailyHours}\n`;
+        rows.push([emp.username, emp.total_hours, emp.average_daily_hours, ...emp.daily_breakdown.map((day: any) => day.hours_worked)]);
       });
     } else if (currentTab === 'custom') {
-      csvContent = 'Employee,Estimated Active Hours,Heartbeats,Detailed Logs,First Activity,Last Activity\n';
+      rows.push(['Employee', 'Estimated Active Hours', 'Heartbeats', 'Detailed Logs', 'First Activity', 'Last Activity']);
       data.employees.forEach((emp: any) => {
-        csvContent += `${emp.username},${emp.estimated_active_hours},${emp.heartbeats_count},${emp.logs_count},${new Date(emp.first_activity).toLocaleString()},${new Date(emp.last_activity).toLocaleString()}\n`;
+        rows.push([emp.username, emp.estimated_active_hours, emp.heartbeats_count, emp.logs_count, formatDateTime(emp.first_activity), formatDateTime(emp.last_activity)]);
       });
     }
 
+    const csvContent = rows.map(row => row.map(csvField).join(',')).join('\n') + '\n';
     const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
     const link = document.createElement('a');
     link.href = URL.createObjectURL(blob);
@@ -103,6 +124,7 @@ const ReportsSection: React.FC = () => {
         <input 
           type="date" 
           id="weeklyDate" 
+          ref={weeklyDateRef}
           defaultValue={getWeekStart().toISOString().split('T')[0]} 
         />
         <button className="btn btn-primary-sm" onClick={loadWeeklyReport}>
@@ -173,9 +195,9 @@ const ReportsSection: React.FC = () => {
     <div>
       <div className="date-picker">
         <label>From:</label>
-        <input type="date" id="customFromDate" />
+        <input type="date" id="customFromDate" ref={customFromRef} />
         <label>To:</label>
-        <input type="date" id="customToDate" />
+        <input type="date" id="customToDate" ref={customToRef} />
         <button className="btn btn-primary-sm" onClick={loadCustomReport}>
           Generate Report
         </button>
@@ -234,8 +256,8 @@ const ReportsSection: React.FC = () => {
                     <td>{emp.estimated_active_hours}h</td>
                     <td>{emp.heartbeats_count}</td>
                     <td>{emp.logs_count}</td>
-                    <td>{new Date(emp.first_activity).toLocaleString()}</td>
-                    <td>{new Date(emp.last_activity).toLocaleString()}</td>
+                    <td>{formatDateTime(emp.first_activity)}</td>
+                    <td>{formatDateTime(emp.last_activity)}</td>
                   </tr>
                 ))}
               </tbody>
@@ -255,6 +277,7 @@ const ReportsSection: React.FC = () => {
         <input 
           type="date" 
           id="dailyDate" 
+          ref={dailyDateRef}
           defaultValue={new Date().toISOString().split('T')[0]} 
         />
         <button className="btn btn-primary-sm" onClick={loadDailyReport}>
@@ -305,8 +328,8 @@ const ReportsSection: React.FC = () => {
                   <tr key={emp.username}>
                     <td><strong>{emp.username}</strong></td>
                     <td>{emp.hours_worked}h</td>
-                    <td>{new Date(emp.first_activity).toLocaleTimeString()}</td>
-                    <td>{new Date(emp.last_activity).toLocaleTimeString()}</td>
+                    <td>{formatTime(emp.first_activity)}</td>
+                    <td>{formatTime(emp.last_activity)}</td>
                     <td>{emp.heartbeats_count}</td>
                     <td>{emp.logs_count}</td>
                   </tr>
@@ -1,6 +1,7 @@
 
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
 import axios from 'axios';
+import { clearApiCache } from '../apiCache';
 
 interface AuthContextType {
   token: string | null;
@@ -87,6 +88,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     setToken(null);
     localStorage.removeItem('adminToken');
     delete axios.defaults.headers.common['Authorization'];
+    clearApiCache();
   };
 
   // Initialize authentication state
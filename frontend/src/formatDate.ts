@@ -0,0 +1,32 @@
+// Shared Intl formatters; building one per call is what makes toLocaleString() slow
+// in long tables. Options match the toLocale*String() defaults, so output is unchanged.
+const dateTimeFormat = new Intl.DateTimeFormat(undefined, {
+  year: 'numeric', month: 'numeric', day: 'numeric',
+  hour: 'numeric', minute: 'numeric', second: 'numeric'
+});
+const dateFormat = new Intl.DateTimeFormat(undefined, { year: 'numeric', month: 'numeric', day: 'numeric' });
+const timeFormat = new Intl.DateTimeFormat(undefined, { hour: 'numeric', minute: 'numeric', second: 'numeric' });
+
+const MAX_CACHED = 5000;
+
+const memoized = (format: Intl.DateTimeFormat) => {
+  const cache = new Map<string, string>();
+  return (value: string | number): string => {
+    const key = String(value);
+    let formatted = cache.get(key);
+    if (formatted === undefined) {
+      const date = new Date(value);
+      // format() throws on an invalid date where toLocaleString() returned this
+      formatted = isNaN(date.getTime()) ? 'Invalid Date' : format.format(date);
+      if (cache.size >= MAX_CACHED) {
+        cache.clear();
+      }
+      cache.set(key, formatted);
+    }
+    return formatted;
+  };
+};
+
+export const formatDateTime = memoized(dateTimeFormat);
+export const formatDate = memoized(dateFormat);
+export const formatTime = memoized(timeFormat);
@@ -12,6 +12,15 @@ export default defineConfig({
       '/api': {
         target: 'http://0.0.0.0:8000',
         changeOrigin: true
+      },
+      '/screenshots': {
+        target: 'http://0.0.0.0:8000',
+        changeOrigin: true
+      },
+      '/ws': {
+        target: 'http://0.0.0.0:8000',
+        ws: true,
+        changeOrigin: true
       }
     }
   },
@@ -1,11 +1,20 @@
+import os
+import time
+import asyncio
+import hmac
+import hashlib
+import secrets
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 import bcrypt
-from sqlalchemy.orm import Session
-from database import get_db, AdminUser
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal, AdminUser
+from response_cache import TTLCache, make_cache
 
 # Configuration
 SECRET_KEY = "your-secret-key-change-this-in-production"
@@ -14,17 +23,79 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
 # Auth token for agents (simple token-based auth)
 AGENT_TOKEN = "agent-secret-token-change-this-in-production"
+_AGENT_TOKEN_B = AGENT_TOKEN.encode('utf-8')
+
+# bcrypt work factor; tune via env without a redeploy
+_BCRYPT_SALT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 # Use bcrypt directly for better compatibility
 def _hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=_BCRYPT_SALT_ROUNDS)).decode('utf-8')
 
 def _verify_password(password: str, hashed: str) -> bool:
     """Verify a password against its hash"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+# Recent successful password checks, keyed by an HMAC of the stored hash and
+# the submitted password, so repeat logins within the TTL skip bcrypt
+_LOGIN_CACHE_TTL = 300
+_LOGIN_CACHE_SIZE = 1024
+_verified_logins = {}
+
+def verify_password_cached(plain_password: str, hashed_password: str) -> bool:
+    key = hmac.new(SECRET_KEY.encode('utf-8'), f"{hashed_password}:{plain_password}".encode('utf-8'),
+                   hashlib.sha256).digest()
+    expires_at = _verified_logins.get(key)
+    if expires_at is not None and expires_at > time.monotonic():
+        return True
+    if not _verify_password(plain_password, hashed_password):
+        return False
+    if len(_verified_logins) >= _LOGIN_CACHE_SIZE:
+        _verified_logins.clear()
+    _verified_logins[key] = time.monotonic() + _LOGIN_CACHE_TTL
+    return True
+
+# bcrypt releases the GIL, so a pool sized to the CPU count checks passwords in
+# parallel, and a burst of logins can't occupy the threadpool the sync
+# endpoints share
+_bcrypt_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="bcrypt")
+
+# Checked when the username doesn't exist, so that case costs the same bcrypt
+# work as a wrong password and response times don't reveal valid usernames
+_DUMMY_HASH = _hash_password(secrets.token_urlsafe(16))
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """verify_password_cached on the bcrypt pool, for async endpoints"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, verify_password_cached, plain_password,
+                                      hashed_password or _DUMMY_HASH)
+
+# Screenshot links are signed so the static /screenshots mount needs no bearer
+# header; the expiry is rounded up to a TTL boundary so a link stays stable
+# (and browser-cacheable) across dashboard polls
+SCREENSHOT_URL_TTL = int(os.getenv("SCREENSHOT_URL_TTL", "3600"))
+
+def _screenshot_signature(filename: str, expires: int) -> str:
+    return hmac.new(SECRET_KEY.encode('utf-8'), f"{filename}:{expires}".encode('utf-8'),
+                    hashlib.sha256).hexdigest()[:32]
+
+def sign_screenshot_url(filename: str) -> str:
+    """/screenshots URL for `filename`, valid for between one and two TTLs"""
+    expires = (int(time.time()) // SCREENSHOT_URL_TTL + 2) * SCREENSHOT_URL_TTL
+    return f"/screenshots/{filename}?expires={expires}&sig={_screenshot_signature(filename, expires)}"
+
+def verify_screenshot_signature(filename: str, expires: Optional[str], sig: Optional[str]) -> bool:
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_screenshot_signature(filename, expires), sig or "")
+
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 class AuthenticationError(HTTPException):
     def __init__(self):
@@ -50,22 +121,99 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+# Decoded JWT payloads keyed by token digest, so polling dashboards skip
+# the HMAC check and JSON parse on every request
+_TOKEN_CACHE_SIZE = 4096
+_token_cache = {}
+
+def _decode_token(token: str) -> dict:
+    key = hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+    payload = _token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if len(_token_cache) >= _TOKEN_CACHE_SIZE:
+            _token_cache.clear()
+        _token_cache[key] = payload
+    elif payload.get("exp", 0) <= time.time():
+        raise JWTError("Signature has expired.")
+    return payload
+
+# Admin rows resolved from tokens; deactivating an admin takes effect within the TTL
+_ADMIN_CACHE_TTL = 30
+_admin_cache = TTLCache(_ADMIN_CACHE_TTL)
+
+def _load_admin(username: str, uid: Optional[int]):
+    # Tokens carry the admin id, so this is a primary-key lookup; only the
+    # columns callers need are loaded and a plain row is returned
+    query = select(AdminUser.id, AdminUser.username, AdminUser.is_active).where(AdminUser.username == username)
+    if uid is not None:
+        query = query.where(AdminUser.id == uid)
+    with SessionLocal() as db:
+        return db.execute(query).first()
+
+async def _resolve_admin(payload: dict):
+    # Decoding runs on the event loop; only a cache miss touches the database
+    username = payload.get("sub")
+    uid = payload.get("uid")
+    cache_key = f"{username}:{uid}"
+    user = _admin_cache.get(cache_key)
+    if user is None:
+        user = await run_in_threadpool(_load_admin, username, uid)
+        if user is not None:
+            _admin_cache.set(cache_key, user)
+    if user is None or user.is_active is False:
+        raise AuthenticationError()
+    return user
+
+async def verify_admin_jwt(token: str):
+    """Admin row for an access token; also used where there is no Authorization header"""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise AuthenticationError()
+        payload = _decode_token(token)
     except JWTError:
         raise AuthenticationError()
+    # Download tokens are only good for the download link they were issued for
+    if payload.get("sub") is None or payload.get("scope") == "download":
+        raise AuthenticationError()
+    return await _resolve_admin(payload)
 
-    user = db.query(AdminUser).filter(AdminUser.username == username).first()
-    if user is None or user.is_active is False:
+async def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await verify_admin_jwt(credentials.credentials)
+
+# One-shot tokens that let a plain link download the agent without an Authorization header.
+# Used jtis are shared through Redis when REDIS_URL is set; without it they are tracked
+# per process, so with several workers a token can be replayed once per worker.
+# The prefix keeps them out of reach of status_cache.invalidate()
+DOWNLOAD_TOKEN_EXPIRE_SECONDS = 60
+_used_download_tokens = make_cache(DOWNLOAD_TOKEN_EXPIRE_SECONDS, prefix="wfh-download:")
+
+def create_download_token(admin) -> str:
+    return create_access_token(
+        data={"sub": admin.username, "uid": admin.id, "scope": "download", "jti": secrets.token_hex(8)},
+        expires_delta=timedelta(seconds=DOWNLOAD_TOKEN_EXPIRE_SECONDS),
+    )
+
+async def verify_download_access(request: Request,
+                                 credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """Accept either an admin bearer token or a one-shot ?token= download token"""
+    if credentials is not None:
+        return await verify_admin_token(credentials)
+
+    token = request.query_params.get("token")
+    if not token:
         raise AuthenticationError()
-    return user
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise AuthenticationError()
+    jti = payload.get("jti")
+    if payload.get("scope") != "download" or payload.get("sub") is None or not jti:
+        raise AuthenticationError()
+    if not await run_in_threadpool(_used_download_tokens.add, jti, True):
+        raise AuthenticationError()
+    return await _resolve_admin(payload)
 
-def verify_agent_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    if credentials.credentials != AGENT_TOKEN:
+async def verify_agent_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    if not hmac.compare_digest(credentials.credentials.encode('utf-8'), _AGENT_TOKEN_B):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid agent token",
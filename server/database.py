@@ -1,34 +1,118 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Text, Boolean, Index, JSON, and_, or_
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
 from datetime import datetime, timedelta
+import json
 import os
+import time
+
+__all__ = [
+    "engine", "SessionLocal", "Base", "get_db", "create_tables",
+    "EmployeeHeartbeat", "EmployeeLog", "EmployeeActivitySummary",
+    "EmployeeHourlyActivity", "EmployeePresence", "AdminUser", "SchemaVersion",
+    "upsert_presence", "latest_heartbeats", "latest_logs", "ensure_heartbeat_partitions", "drop_heartbeat_partitions",
+    "day_bucket", "heartbeats_on_day",
+]
 
 # Use SQLite for development if PostgreSQL is not available
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./monitoring.db")
 
+Base = declarative_base()
+
 # Handle PostgreSQL URL format for production
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg2://")
 
+def _configure_sqlite(sqlite_engine):
+    """Per-connection pragmas and explicit transaction control for SQLite engines"""
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _sqlite_pragma(dbapi_conn, _):
+        # Let SQLAlchemy emit BEGIN itself instead of pysqlite's implicit one
+        dbapi_conn.isolation_level = None
+        c = dbapi_conn.cursor()
+        # WAL lets readers run alongside the heartbeat writer and NORMAL
+        # sync skips the fsync on every commit
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.execute("PRAGMA temp_store=MEMORY")
+        c.execute("PRAGMA mmap_size=268435456")
+        c.close()
+
+    @event.listens_for(sqlite_engine, "begin")
+    def _sqlite_begin(conn):
+        # Writers such as the heartbeat flush ask for sqlite_begin="IMMEDIATE"
+        # to take the write lock up front rather than upgrading mid-transaction
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', '')}".strip())
+
+# Statements slower than this are printed with their duration; 0 turns it off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+def _log_slow_queries(target_engine):
+    """Print statements that take longer than SLOW_QUERY_MS on target_engine"""
+
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _report_slow_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info.pop("query_start", time.perf_counter())) * 1000
+        if elapsed_ms >= SLOW_QUERY_MS:
+            print(f"Slow query ({elapsed_ms:.0f} ms): {' '.join(statement.split())[:500]}")
+
 try:
     if DATABASE_URL.startswith("sqlite"):
         engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+        _configure_sqlite(engine)
     else:
-        engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
+        # Size the pool for concurrent agent uploads; rely on TCP keepalives
+        # (and PgBouncer, where deployed) instead of a SELECT 1 per checkout
+        # unless DB_POOL_PRE_PING is set
+        engine = create_engine(
+            DATABASE_URL,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "40")),
+            pool_timeout=30,
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "300")),
+            pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+            connect_args={
+                "keepalives": 1,
+                "keepalives_idle": 30,
+                "keepalives_interval": 10,
+                "keepalives_count": 5
+            }
+        )
 
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base = declarative_base()
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
     print(f"Database connected successfully: {DATABASE_URL.split('@')[0] if '@' in DATABASE_URL else 'Local SQLite'}")
 except Exception as e:
     print(f"Database connection error: {e}")
     # Fallback to SQLite
     DATABASE_URL = "sqlite:///./monitoring.db"
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base = declarative_base()
+    _configure_sqlite(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
     print("Fallback: Using SQLite database")
 
+if SLOW_QUERY_MS > 0:
+    _log_slow_queries(engine)
+
+class utcnow(FunctionElement):
+    """Current UTC time as a naive timestamp, evaluated by the database"""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow, "postgresql")
+def _pg_utcnow(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
 class EmployeeHeartbeat(Base):
     __tablename__ = "employee_heartbeats"
 
@@ -41,8 +125,18 @@ class EmployeeHeartbeat(Base):
     department = Column(String, index=True)
     manager = Column(String)
     status = Column(String, default="online")
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, server_default=utcnow())
+    created_at = Column(DateTime, server_default=utcnow())
+    # UTC day of `timestamp` as a proleptic ordinal (see day_bucket), so one
+    # employee's day is an equality probe instead of a timestamp range scan
+    day_bucket = Column(Integer)
+
+    # Latest-heartbeat-per-user and per-user range lookups; timestamp alone for cleanup
+    __table_args__ = (
+        Index("ix_hb_user_ts", username, timestamp.desc()),
+        Index("ix_hb_ts", timestamp),
+        Index("ix_hb_user_day", username, day_bucket),
+    )
 
 class EmployeeLog(Base):
     __tablename__ = "employee_logs"
@@ -57,11 +151,16 @@ class EmployeeLog(Base):
     manager = Column(String)
     local_ip = Column(String)
     public_ip = Column(String)
-    location = Column(Text)  # JSON string with location data
+    location = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"))  # location dict
     screenshot_path = Column(String)
     activity_data = Column(Text, default="{}")  # JSON string for comprehensive activity tracking
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, server_default=utcnow())
+    created_at = Column(DateTime, server_default=utcnow())
+
+    __table_args__ = (
+        Index("ix_log_user_ts", username, timestamp.desc()),
+        Index("ix_log_ts", timestamp),
+    )
 
 class EmployeeActivitySummary(Base):
     __tablename__ = "employee_activity_summaries"
@@ -85,6 +184,11 @@ class EmployeeActivitySummary(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # /api/log upserts and day-details look up one employee's day
+        Index("ix_summary_user_date", username, date),
+    )
+
 class EmployeeHourlyActivity(Base):
     __tablename__ = "employee_hourly_activity"
     
@@ -100,18 +204,18 @@ class EmployeeHourlyActivity(Base):
     screen_locked = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class EmployeeDetailedLog(Base):
-    __tablename__ = "employee_detailed_logs"
+    __table_args__ = (
+        Index("ix_hourly_user_date_hour", username, date, hour),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, index=True)
+class EmployeePresence(Base):
+    """Latest heartbeat per employee, upserted on every heartbeat flush"""
+    __tablename__ = "employee_presence"
+
+    username = Column(String, primary_key=True)
     hostname = Column(String)
-    local_ip = Column(String)
-    public_ip = Column(String)
-    location = Column(Text)  # JSON string
-    screenshot_path = Column(String)
-    activity_data = Column(Text, default="{}")  # JSON string for activity tracking
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    status = Column(String, default="online")
+    last_seen = Column(DateTime, nullable=False)
 
 class AdminUser(Base):
     __tablename__ = "admin_users"
@@ -120,32 +224,190 @@ class AdminUser(Base):
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utcnow())
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+# Bump when create_tables gains a new migration step
+CURRENT_SCHEMA_VERSION = 9
+
+def day_bucket(value) -> int:
+    """Heartbeat day bucket for a UTC datetime or date"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+def heartbeats_on_day(day):
+    """Filter for heartbeats on a UTC date. Rows without a day_bucket (written by
+    an older server during a rolling deploy, or inserted by hand) still match
+    on their timestamp"""
+    start = datetime(day.year, day.month, day.day)
+    return or_(
+        EmployeeHeartbeat.day_bucket == day_bucket(day),
+        and_(
+            EmployeeHeartbeat.day_bucket.is_(None),
+            EmployeeHeartbeat.timestamp >= start,
+            EmployeeHeartbeat.timestamp < start + timedelta(days=1)
+        )
+    )
+
+def upsert_presence(conn, rows):
+    """Advance employee_presence.last_seen from a batch of heartbeat rows"""
+    latest = {}
+    for row in rows:
+        current = latest.get(row["username"])
+        if current is None or row["timestamp"] > current["last_seen"]:
+            latest[row["username"]] = {
+                "username": row["username"],
+                "hostname": row["hostname"],
+                "status": row["status"],
+                "last_seen": row["timestamp"],
+            }
+    if not latest:
+        return
+
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(EmployeePresence).values(list(latest.values()))
+    # Replayed (older) heartbeats must not move last_seen backwards
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EmployeePresence.username],
+        set_={
+            "hostname": stmt.excluded.hostname,
+            "status": stmt.excluded.status,
+            "last_seen": stmt.excluded.last_seen,
+        },
+        where=EmployeePresence.last_seen < stmt.excluded.last_seen
+    )
+    conn.execute(stmt)
+
+def latest_heartbeats(db):
+    """Latest heartbeat row per username, in a single query"""
+    from sqlalchemy import desc, func
+    if db.get_bind().dialect.name == "postgresql":
+        return db.query(EmployeeHeartbeat).distinct(EmployeeHeartbeat.username).order_by(
+            EmployeeHeartbeat.username, desc(EmployeeHeartbeat.timestamp)
+        ).all()
+
+    ranked = db.query(
+        EmployeeHeartbeat.id,
+        func.row_number().over(
+            partition_by=EmployeeHeartbeat.username,
+            order_by=desc(EmployeeHeartbeat.timestamp)
+        ).label("rn")
+    ).subquery()
+    return db.query(EmployeeHeartbeat).join(ranked, EmployeeHeartbeat.id == ranked.c.id).filter(
+        ranked.c.rn == 1
+    ).order_by(EmployeeHeartbeat.username).all()
+
+def latest_logs(db, usernames=None):
+    """(username, location, timestamp) of each employee's latest log, in a single query;
+    `usernames` limits it to those employees"""
+    from sqlalchemy import desc, func
+    columns = (EmployeeLog.username, EmployeeLog.location, EmployeeLog.timestamp)
+    if db.get_bind().dialect.name == "postgresql":
+        query = db.query(*columns)
+        if usernames is not None:
+            query = query.filter(EmployeeLog.username.in_(usernames))
+        return query.distinct(EmployeeLog.username).order_by(
+            EmployeeLog.username, desc(EmployeeLog.timestamp)
+        ).all()
+
+    query = db.query(
+        *columns,
+        func.row_number().over(
+            partition_by=EmployeeLog.username,
+            order_by=desc(EmployeeLog.timestamp)
+        ).label("rn")
+    )
+    if usernames is not None:
+        query = query.filter(EmployeeLog.username.in_(usernames))
+    ranked = query.subquery()
+    return db.query(ranked.c.username, ranked.c.location, ranked.c.timestamp).filter(ranked.c.rn == 1).all()
+
+def _heartbeats_partitioned(conn) -> bool:
+    from sqlalchemy import text
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'employee_heartbeats'::regclass"
+    )).first() is not None
+
+def ensure_heartbeat_partitions(days_ahead: int = 7):
+    """Pre-create daily partitions when employee_heartbeats is range-partitioned on Postgres"""
+    if engine.dialect.name != "postgresql":
+        return
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        if not _heartbeats_partitioned(conn):
+            return
+        today = datetime.utcnow().date()
+        for offset in range(days_ahead + 1):
+            day = today + timedelta(days=offset)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS employee_heartbeats_{day:%Y%m%d} "
+                f"PARTITION OF employee_heartbeats "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+
+def drop_heartbeat_partitions(cutoff: datetime):
+    """Drop daily partitions entirely older than cutoff; None when the table is not partitioned"""
+    if engine.dialect.name != "postgresql":
+        return None
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        if not _heartbeats_partitioned(conn):
+            return None
+        partitions = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'employee_heartbeats'::regclass"
+        )).scalars().all()
+        dropped = 0
+        for name in partitions:
+            try:
+                day = datetime.strptime(name.rsplit("_", 1)[-1], "%Y%m%d")
+            except ValueError:
+                continue  # default or differently named partition
+            if day + timedelta(days=1) <= cutoff:
+                conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                dropped += 1
+        return dropped
 
 # Database dependency
 def get_db():
-    db = SessionLocal()
-    try:
-        # Test the connection
-        from sqlalchemy import text
-        db.execute(text("SELECT 1"))
+    # No per-request SELECT 1: the pool checks connections itself when
+    # DB_POOL_PRE_PING is set, and stale ones surface on first use otherwise.
+    # Closing the session rolls back anything the handler left uncommitted.
+    with SessionLocal() as db:
         yield db
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
 
 # Create tables
 def create_tables():
     """Create all tables and handle schema migrations"""
+    from sqlalchemy import inspect, select, text
+
+    # Skip catalog introspection once migrations have been applied
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(select(SchemaVersion.version)).scalar()
+        if version is not None and version >= CURRENT_SCHEMA_VERSION:
+            print(f"Database schema up to date (version {version})")
+            return
+    except Exception:
+        pass  # schema_version table does not exist yet
+
+    # A step that fails without aborting the whole run leaves the version
+    # unrecorded, so the migration runs again on the next boot
+    failed = False
     try:
         # Create all tables
         Base.metadata.create_all(bind=engine)
         
         # Check if we need to add missing columns to existing tables
-        from sqlalchemy import inspect, text
         inspector = inspect(engine)
         
         # Check employee_heartbeats table for missing columns
@@ -156,7 +418,8 @@ def create_tables():
                 ('employee_email', 'VARCHAR'),
                 ('employee_name', 'VARCHAR'),
                 ('department', 'VARCHAR'),
-                ('manager', 'VARCHAR')
+                ('manager', 'VARCHAR'),
+                ('day_bucket', 'INTEGER')
             ]
             
             # Add missing columns
@@ -168,7 +431,9 @@ def create_tables():
                             conn.commit()
                             print(f"Added missing column {col_name} to employee_heartbeats")
                         except Exception as e:
+                            conn.rollback()
                             print(f"Column {col_name} might already exist: {e}")
+                            failed = True
                             
         # Check employee_logs table for missing columns
         if 'employee_logs' in inspector.get_table_names():
@@ -190,7 +455,120 @@ def create_tables():
                             conn.commit()
                             print(f"Added missing column {col_name} to employee_logs")
                         except Exception as e:
+                            conn.rollback()
                             print(f"Column {col_name} might already exist: {e}")
+                            failed = True
+                            
+        # Fill day_bucket for heartbeats written before the column existed;
+        # matches date.toordinal(), where 0001-01-01 is day 1
+        if 'employee_heartbeats' in inspector.get_table_names():
+            if engine.dialect.name == "postgresql":
+                bucket_sql = "(timestamp::date - DATE '0001-01-01') + 1"
+            else:
+                bucket_sql = "CAST(julianday(date(timestamp)) - julianday('0001-01-01') AS INTEGER) + 1"
+            with engine.begin() as conn:
+                filled = conn.execute(text(
+                    f"UPDATE employee_heartbeats SET day_bucket = {bucket_sql} "
+                    "WHERE day_bucket IS NULL AND timestamp IS NOT NULL"
+                )).rowcount
+            if filled:
+                print(f"Backfilled day_bucket for {filled} heartbeats")
+
+        # Location moved from serialized text to JSONB on Postgres; SQLite keeps
+        # the same JSON text under a JSON column type. Older rows can hold ''
+        # or malformed text, which would break the cast and every read, so
+        # anything that isn't a JSON object is cleared first
+        if 'employee_logs' in inspector.get_table_names():
+            location_type = next(
+                (col['type'] for col in inspector.get_columns('employee_logs') if col['name'] == 'location'), None
+            )
+            with engine.begin() as conn:
+                if engine.dialect.name != "postgresql":
+                    cleared = conn.execute(text(
+                        "UPDATE employee_logs SET location = NULL WHERE location IS NOT NULL AND "
+                        "CASE WHEN json_valid(location) THEN json_type(location) != 'object' ELSE 1 END"
+                    )).rowcount
+                elif isinstance(location_type, JSONB):
+                    cleared = conn.execute(text(
+                        "UPDATE employee_logs SET location = NULL WHERE jsonb_typeof(location) != 'object'"
+                    )).rowcount
+                else:
+                    bad_ids = []
+                    for log_id, location in conn.execute(text(
+                        "SELECT id, location FROM employee_logs WHERE location IS NOT NULL"
+                    )):
+                        try:
+                            valid = isinstance(json.loads(location), dict)
+                        except ValueError:
+                            valid = False
+                        if not valid:
+                            bad_ids.append(log_id)
+                    for start in range(0, len(bad_ids), 1000):
+                        conn.execute(
+                            text("UPDATE employee_logs SET location = NULL WHERE id = ANY(:ids)"),
+                            {"ids": bad_ids[start:start + 1000]}
+                        )
+                    cleared = len(bad_ids)
+                    conn.execute(text(
+                        "ALTER TABLE employee_logs ALTER COLUMN location TYPE jsonb USING location::jsonb"
+                    ))
+                    print("Converted employee_logs.location to jsonb")
+            if cleared:
+                print(f"Cleared {cleared} malformed employee_logs.location values")
+
+        # Timestamp defaults moved into the database; SQLite cannot alter a
+        # column default, and every insert path sets timestamp explicitly
+        if engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                for table_name, col_name in [
+                    ('employee_heartbeats', 'timestamp'), ('employee_heartbeats', 'created_at'),
+                    ('employee_logs', 'timestamp'), ('employee_logs', 'created_at'),
+                    ('admin_users', 'created_at')
+                ]:
+                    conn.execute(text(
+                        f"ALTER TABLE {table_name} ALTER COLUMN {col_name} SET DEFAULT TIMEZONE('utc', CURRENT_TIMESTAMP)"
+                    ))
+
+        # create_all skips tables that already exist, so add any indexes
+        # introduced since those tables were created. Postgres builds them
+        # CONCURRENTLY so agents keep writing meanwhile; partitioned parents
+        # don't support that and get a regular build
+        if engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                partitioned = _heartbeats_partitioned(conn)
+                for table in Base.metadata.sorted_tables:
+                    concurrently = not (partitioned and table.name == "employee_heartbeats")
+                    for index in table.indexes:
+                        index.dialect_options["postgresql"]["concurrently"] = concurrently
+                        try:
+                            index.create(bind=conn, checkfirst=True)
+                        finally:
+                            index.dialect_options["postgresql"]["concurrently"] = False
+        else:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
+
+        # Seed employee_presence from heartbeat history on first run
+        with SessionLocal() as db:
+            if db.query(EmployeePresence).first() is None:
+                rows = [
+                    {"username": hb.username, "hostname": hb.hostname, "status": hb.status, "timestamp": hb.timestamp}
+                    for hb in latest_heartbeats(db)
+                    if hb.username and hb.timestamp
+                ]
+                if rows:
+                    upsert_presence(db.connection(), rows)
+                    db.commit()
+                    print(f"Backfilled employee_presence for {len(rows)} employees")
+
+        if failed:
+            print("Database schema check incomplete; will retry on next start")
+            return
+
+        with engine.begin() as conn:
+            conn.execute(SchemaVersion.__table__.delete())
+            conn.execute(SchemaVersion.__table__.insert().values(id=1, version=CURRENT_SCHEMA_VERSION))
                             
         print("Database schema check completed")
         
@@ -0,0 +1,183 @@
+"""
+In-process write buffer for agent heartbeats.
+Heartbeats are queued by the request handlers and flushed to the database
+by a background task in batches (COPY on Postgres, multi-row INSERT elsewhere).
+"""
+
+import asyncio
+import io
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from starlette.concurrency import run_in_threadpool
+
+from database import engine, EmployeeHeartbeat, upsert_presence, day_bucket
+import status_broadcast
+
+# Seconds a batch may wait for more rows, and the most rows per transaction;
+# a shorter window lowers heartbeat-to-dashboard latency at the cost of more commits
+FLUSH_INTERVAL = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "0.5"))
+MAX_BATCH_SIZE = int(os.getenv("HEARTBEAT_BATCH_SIZE", "500"))
+# Rows held while the database is unreachable; past this, agents are told to retry
+MAX_QUEUE_SIZE = int(os.getenv("HEARTBEAT_QUEUE_SIZE", "50000"))
+RETRY_DELAY = 1.0
+
+_queue: Optional[asyncio.Queue] = None
+_flush_task: Optional[asyncio.Task] = None
+_STOP = object()
+
+
+COPY_COLUMNS = (
+    "username", "hostname", "employee_id", "employee_email", "employee_name",
+    "department", "manager", "status", "timestamp", "day_bucket",
+)
+
+
+def _csv_field(value) -> str:
+    """Quote every value so '' stays an empty string; only None is left as a bare
+    empty field, which COPY reads as NULL"""
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_rows(conn, rows: List[Dict[str, Any]]):
+    """Stream one batch into Postgres with COPY FROM STDIN"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(
+            _csv_field(row["timestamp"].isoformat() if col == "timestamp" else row.get(col))
+            for col in COPY_COLUMNS
+        ))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    statement = f"COPY employee_heartbeats ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')"
+    dbapi = conn.dialect.loaded_dbapi
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    except dbapi.Error as e:
+        # The raw cursor bypasses SQLAlchemy's error wrapping; translate so a
+        # dropped connection surfaces as OperationalError and gets requeued
+        invalidated = conn.dialect.is_disconnect(e, conn.connection, cursor)
+        if invalidated:
+            conn.invalidate(e)
+        raise DBAPIError.instance(
+            statement, None, e, dbapi.Error, connection_invalidated=invalidated, dialect=conn.dialect
+        ) from e
+    finally:
+        try:
+            cursor.close()
+        except dbapi.Error:
+            pass
+
+
+def _insert_rows(rows: List[Dict[str, Any]]):
+    """Write one batch and advance employee presence in a single transaction"""
+    for row in rows:
+        row["day_bucket"] = day_bucket(row["timestamp"])
+    with engine.connect() as conn, conn.execution_options(sqlite_begin="IMMEDIATE").begin():
+        if engine.dialect.name == "postgresql":
+            # Heartbeats are re-sent every few minutes; losing the last few
+            # on a crash is cheaper than an fsync per batch
+            conn.execute(text("SET LOCAL synchronous_commit = OFF"))
+            _copy_rows(conn, rows)
+        else:
+            conn.execute(EmployeeHeartbeat.__table__.insert(), rows)
+        upsert_presence(conn, rows)
+
+
+class BufferFull(Exception):
+    """The queue is at MAX_QUEUE_SIZE, usually because flushes are failing"""
+
+
+async def _write(rows: List[Dict[str, Any]], requeue: bool = True):
+    try:
+        await run_in_threadpool(_insert_rows, rows)
+    except (OperationalError, InterfaceError) as e:
+        # Database unavailable: keep the rows for the next flush instead of dropping them
+        kept = 0
+        if requeue:
+            for row in rows:
+                try:
+                    _queue.put_nowait(row)
+                except asyncio.QueueFull:
+                    break
+                kept += 1
+        print(f"Error flushing {len(rows)} heartbeats, requeued {kept}: {e}")
+        await asyncio.sleep(RETRY_DELAY)
+        return
+    except Exception as e:
+        print(f"Error flushing {len(rows)} heartbeats: {e}")
+        return
+    status_broadcast.notify()
+
+
+async def _flush_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await _queue.get()
+        if item is _STOP:
+            return
+
+        rows = [item]
+        deadline = loop.time() + FLUSH_INTERVAL
+        stopping = False
+        while len(rows) < MAX_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            rows.append(item)
+
+        await _write(rows)
+        if stopping:
+            return
+
+
+def enqueue(row: Dict[str, Any]):
+    """Queue a heartbeat row for the next flush; raises BufferFull when the queue is full"""
+    try:
+        _queue.put_nowait(row)
+    except asyncio.QueueFull:
+        raise BufferFull()
+
+
+def enqueue_many(rows: List[Dict[str, Any]]):
+    # All or nothing, so an agent retrying the batch doesn't duplicate half of it
+    if _queue.maxsize - _queue.qsize() < len(rows):
+        raise BufferFull()
+    for row in rows:
+        _queue.put_nowait(row)
+
+
+async def start():
+    global _queue, _flush_task
+    _queue = asyncio.Queue(MAX_QUEUE_SIZE)
+    _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop():
+    """Flush whatever is still queued and stop the background task"""
+    global _flush_task
+    if _flush_task is None:
+        return
+    await _queue.put(_STOP)
+    await _flush_task
+    _flush_task = None
+
+    # Rows queued behind the stop marker
+    rows = []
+    while not _queue.empty():
+        rows.append(_queue.get_nowait())
+    if rows:
+        await _write(rows, requeue=False)
@@ -1,55 +1,86 @@
 import os
-import json
-from datetime import datetime, timedelta
-from typing import Optional
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
+import re
+import gzip
+import time
+import orjson
+import shutil
+import hashlib
+import mimetypes
+import secrets
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta, timezone
+from typing import List, Optional
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Request, Response, BackgroundTasks
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, ORJSONResponse, RedirectResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, and_
+from sqlalchemy import delete, desc, func, and_, or_, select
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, QueryParams
 from pydantic import BaseModel
 
-from database import get_db, create_tables, EmployeeHeartbeat, EmployeeLog, AdminUser, EmployeeActivitySummary, EmployeeHourlyActivity
-from auth import verify_admin_token, verify_agent_token, get_password_hash, create_access_token, verify_password
+from database import get_db, heartbeats_on_day, SessionLocal, EmployeeHeartbeat, EmployeeLog, AdminUser, EmployeeActivitySummary, EmployeeHourlyActivity, EmployeePresence
+from database import ensure_heartbeat_partitions, drop_heartbeat_partitions, latest_logs
+from auth import verify_admin_token, verify_admin_jwt, verify_agent_token, create_access_token, verify_password_async
+from auth import sign_screenshot_url, verify_screenshot_signature
+from auth import create_download_token, verify_download_access, DOWNLOAD_TOKEN_EXPIRE_SECONDS
+import heartbeat_buffer
+import status_broadcast
+from init_db import initialize_database
+from response_cache import status_cache, get_or_compute, STATUS_CACHE_TTL
 
 # Initialize database using lifespan context manager
 from contextlib import asynccontextmanager
+import anyio
+
+THREADPOOL_WORKERS = int(os.getenv("THREADPOOL_WORKERS", "100"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup. In production the schema and default admin are set up once per
+    # deploy with `python init_db.py` rather than by every worker.
     try:
         print("Starting up application...")
-        create_tables()
-        print("Database tables created successfully")
-
-        # Create default admin user if none exists
-        db = next(get_db())
-        admin = db.query(AdminUser).filter(AdminUser.username == "admin").first()
-        if not admin:
-            print("Creating default admin user...")
-            hashed_password = get_password_hash("admin123")
-            admin_user = AdminUser(username="admin", hashed_password=hashed_password)
-            db.add(admin_user)
-            db.commit()
-            print("Default admin user created: admin/admin123")
-        else:
-            print("Admin user already exists")
-        db.close()
+        if ENVIRONMENT != "production":
+            initialize_database()
+        ensure_heartbeat_partitions()
         print("Application startup completed successfully")
     except Exception as e:
         print(f"Startup error: {e}")
         import traceback
         traceback.print_exc()
 
+    # Sync handlers (DB reads, uploads, bcrypt) run in anyio's worker pool;
+    # the default of 40 threads caps concurrent requests well below the DB pool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_WORKERS
+
+    await heartbeat_buffer.start()
+    await status_broadcast.start()
+
     yield
 
-    # Shutdown (if needed)
+    # Shutdown: persist heartbeats still waiting in the buffer
     print("Application shutting down...")
+    await status_broadcast.stop()
+    await heartbeat_buffer.stop()
+    io_executor.shutdown(wait=True)
 
-# Create FastAPI app with lifespan
-app = FastAPI(title="WFH Employee Monitoring System", version="1.0.0", lifespan=lifespan)
+# Long-lived pool for batched filesystem work (screenshot unlinks), so cleanup
+# does not spin up and tear down its own threads on every call
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+# Create FastAPI app with lifespan. Returned dicts still pass through FastAPI's
+# pure-Python jsonable_encoder first, so the large list and report endpoints
+# return ORJSONResponse directly and let orjson encode rows and datetimes
+app = FastAPI(title="WFH Employee Monitoring System", version="1.0.0", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -60,17 +91,127 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create uploads directory for screenshots
-screenshots_dir = "screenshots"
+# JSON lists (employee status, logs, reports) compress well; responses that
+# already carry a Content-Encoding, like the pre-gzipped dashboard page and
+# screenshots (marked identity), pass through. Level 5 gets nearly all of
+# level 9's size win at a fraction of the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Create uploads directory for screenshots. Point SCREENSHOTS_DIR at a shared
+# mount (NFS, or an object-storage bucket mount with its own expiry rule) when
+# running several server replicas
+screenshots_dir = os.getenv("SCREENSHOTS_DIR", "screenshots")
 os.makedirs(screenshots_dir, exist_ok=True)
 
-# Serve static files from React build
+# Screenshots are served straight from disk by StaticFiles. Behind nginx, set
+# SCREENSHOTS_ACCEL_PREFIX (e.g. "/protected-screenshots/") and add a matching
+# `location /protected-screenshots/ { internal; alias /path/to/screenshots/; }`
+# so /api/screenshots hands the file to nginx's sendfile via X-Accel-Redirect.
+SCREENSHOTS_ACCEL_PREFIX = os.getenv("SCREENSHOTS_ACCEL_PREFIX", "")
+
+# Uploaded screenshots are re-encoded to WebP in the background when Pillow is
+# installed; SCREENSHOT_WEBP_QUALITY=0 keeps the agent's original file
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+SCREENSHOT_WEBP_QUALITY = int(os.getenv("SCREENSHOT_WEBP_QUALITY", "80"))
+TRANSCODE_SCREENSHOTS = Image is not None and SCREENSHOT_WEBP_QUALITY > 0
+_SAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+def _image_extension(header: bytes) -> str:
+    """.png, .jpg or .webp from an image's magic bytes; anything else is stored as .png"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return ".png"
+
+class SignedStaticFiles(StaticFiles):
+    """StaticFiles that only serves paths carrying a signature from sign_screenshot_url"""
+
+    async def get_response(self, path: str, scope):
+        params = QueryParams(scope["query_string"])
+        if not verify_screenshot_signature(path, params.get("expires"), params.get("sig")):
+            raise HTTPException(status_code=403, detail="Invalid or expired screenshot link")
+        response = await super().get_response(path, scope)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        # Images are already compressed; identity keeps GZipMiddleware off them
+        # so Content-Length, Range and sendfile keep working
+        response.headers["Content-Encoding"] = "identity"
+        return response
+
+app.mount("/screenshots", SignedStaticFiles(directory=screenshots_dir), name="screenshots")
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-hashed build output, which browsers may cache for good.
+    A file's name changes with its content, so text assets are gzipped once and
+    then served from memory instead of being recompressed by GZipMiddleware"""
+
+    GZIP_MEDIA_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._gzipped = {}
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        if (not isinstance(response, FileResponse)
+                or not response.media_type.startswith(self.GZIP_MEDIA_TYPES)
+                or "gzip" not in Headers(scope=scope).get("accept-encoding", "")):
+            return response
+
+        body = self._gzipped.get(full_path)
+        if body is None:
+            with open(full_path, "rb") as f:
+                body = gzip.compress(f.read(), 9)
+            self._gzipped[full_path] = body
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        return Response(content=body, status_code=status_code, headers=headers)
+
+# Serve static files from React build; Vite puts a content hash in every
+# /assets filename, so a new build changes the URLs the index page references
 try:
-    app.mount("/assets", StaticFiles(directory="../frontend/dist/assets"), name="assets")
+    app.mount("/assets", ImmutableStaticFiles(directory="../frontend/dist/assets"), name="assets")
     app.mount("/static", StaticFiles(directory="../frontend/dist"), name="static")
 except Exception as e:
     print(f"Warning: Could not mount static files: {e}")
 
+# Dashboard entry page, read and gzipped once; browsers reuse it for a few minutes
+# and then revalidate it with the ETag. /login is a client-side route, so a
+# reload there gets the same page
+try:
+    with open("../frontend/dist/index.html", "rb") as f:
+        _INDEX_HTML = f.read()
+    _INDEX_HTML_GZ = gzip.compress(_INDEX_HTML, 9)
+    _INDEX_ETAG = f'"{hashlib.md5(_INDEX_HTML).hexdigest()}"'
+except OSError as e:
+    _INDEX_HTML = None
+    _INDEX_HTML_GZ = None
+    _INDEX_ETAG = None
+    print(f"Warning: Could not load dashboard index.html: {e}")
+
+@app.get("/", include_in_schema=False)
+@app.get("/login", include_in_schema=False)
+async def serve_dashboard(request: Request):
+    """Serve the admin dashboard"""
+    if _INDEX_HTML is None:
+        raise HTTPException(status_code=404, detail="Dashboard build not found")
+    headers = {
+        "ETag": _INDEX_ETAG,
+        "Cache-Control": "private, max-age=300, stale-while-revalidate=60",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=_INDEX_HTML_GZ, media_type="text/html", headers=headers)
+    return Response(content=_INDEX_HTML, media_type="text/html", headers=headers)
+
 # Pydantic models
 class HeartbeatData(BaseModel):
     username: str
@@ -81,6 +222,7 @@ class HeartbeatData(BaseModel):
     department: Optional[str] = ""
     manager: Optional[str] = ""
     status: str = "online"
+    timestamp: Optional[datetime] = None  # UTC; set by agents replaying queued heartbeats
 
 class DetailedLogData(BaseModel):
     username: str
@@ -101,31 +243,84 @@ class WorkingHoursResponse(BaseModel):
     first_seen: datetime
     last_seen: datetime
 
+class EmployeeStatus(BaseModel):
+    username: str
+    hostname: Optional[str] = None
+    status: str
+    last_seen: datetime
+    last_heartbeat: datetime
+    public_ip: str
+    city: str
+    state: str
+    country: str
+    location_updated: Optional[datetime] = None
+
+class EmployeeStatusList(BaseModel):
+    employees: List[EmployeeStatus]
+
+class EmployeeStats(BaseModel):
+    total: int
+    online: int
+    offline: int
+    recent: List[EmployeeStatus]
+
 # Agent endpoints
+@app.get("/health")
+async def health_check():
+    """Liveness probe for agents and load balancers"""
+    return {"status": "ok"}
+
 @app.post("/api/heartbeat")
-def receive_heartbeat(
+async def receive_heartbeat(
     heartbeat: HeartbeatData,
-    agent_auth=Depends(verify_agent_token),
-    db: Session = Depends(get_db)
+    agent_auth=Depends(verify_agent_token)
 ):
     """Receive heartbeat from agent"""
-    heartbeat_record = EmployeeHeartbeat(
-        username=heartbeat.username,
-        hostname=heartbeat.hostname,
-        employee_id=heartbeat.employee_id,
-        employee_email=heartbeat.employee_email,
-        employee_name=heartbeat.employee_name,
-        department=heartbeat.department,
-        manager=heartbeat.manager,
-        status=heartbeat.status,
-        timestamp=datetime.utcnow()
-    )
-    db.add(heartbeat_record)
-    db.commit()
+    row = heartbeat.model_dump()
+    row["timestamp"] = datetime.utcnow()
+    try:
+        heartbeat_buffer.enqueue(row)
+    except heartbeat_buffer.BufferFull:
+        raise HTTPException(status_code=503, detail="Heartbeat buffer full, retry later")
     return {"status": "success", "message": "Heartbeat received"}
 
+@app.post("/api/heartbeat/batch")
+async def receive_heartbeat_batch(
+    heartbeats: List[HeartbeatData],
+    agent_auth=Depends(verify_agent_token)
+):
+    """Receive queued heartbeats from agent"""
+    if not heartbeats:
+        return {"status": "success", "message": "No heartbeats received", "count": 0}
+
+    now = datetime.utcnow()
+    rows = []
+    for heartbeat in heartbeats:
+        row = heartbeat.model_dump()
+        ts = row["timestamp"] or now
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        row["timestamp"] = ts
+        rows.append(row)
+
+    try:
+        heartbeat_buffer.enqueue_many(rows)
+    except heartbeat_buffer.BufferFull:
+        raise HTTPException(status_code=503, detail="Heartbeat buffer full, retry later")
+    return {"status": "success", "message": "Heartbeats received", "count": len(rows)}
+
+# Most screenshots fit in one chunk, so a typical upload is a single read/write
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _save_upload(source, path: str) -> int:
+    """Stream the spooled upload to disk; peak memory stays at one chunk"""
+    with open(path, "wb", buffering=UPLOAD_CHUNK_SIZE) as buffer:
+        shutil.copyfileobj(source, buffer, UPLOAD_CHUNK_SIZE)
+        return buffer.tell()
+
 @app.post("/api/log")
-def receive_detailed_log(
+async def receive_detailed_log(
+    background_tasks: BackgroundTasks,
     username: str = Form(...),
     hostname: str = Form(...),
     employee_id: str = Form(default=""),
@@ -138,8 +333,7 @@ def receive_detailed_log(
     location: str = Form(...),
     activity_data: str = Form(default="{}"),
     screenshot: UploadFile = File(...),
-    agent_auth=Depends(verify_agent_token),
-    db: Session = Depends(get_db)
+    agent_auth=Depends(verify_agent_token)
 ):
     """Receive detailed log with screenshot from agent"""
     try:
@@ -150,187 +344,239 @@ def receive_detailed_log(
 
         # Save screenshot
         timestamp = datetime.utcnow()
-        filename = f"{username}_{timestamp.strftime('%Y%m%d_%H%M%S')}.png"
+        # The stored extension decides the Content-Type it is served with, so it
+        # comes from the file's leading bytes, never from the client's filename
+        uploaded_extension = _image_extension(screenshot.file.read(12))
+        screenshot.file.seek(0)
+        # Agents that already encode WebP are stored as sent
+        transcode = TRANSCODE_SCREENSHOTS and uploaded_extension != ".webp"
+        extension = ".webp" if transcode else uploaded_extension
+        # Unique per upload; two screenshots in the same second no longer overwrite
+        filename = f"{_SAFE_FILENAME_CHARS.sub('_', username)}_{time.time_ns()}_{secrets.token_hex(3)}{extension}"
         screenshot_path = os.path.join(screenshots_dir, filename)
+        upload_path = screenshot_path + ".upload" if transcode else screenshot_path
 
         print(f"Saving screenshot to: {screenshot_path}")
 
-        with open(screenshot_path, "wb") as buffer:
-            content = screenshot.file.read()
-            buffer.write(content)
-            print(f"Screenshot saved, size: {len(content)} bytes")
-
-        # Parse and process comprehensive activity data
-        try:
-            activity_json = json.loads(activity_data)
-
-            # Extract summary data
-            date_str = activity_json.get("date", timestamp.date().isoformat())
-            total_active_minutes = activity_json.get("total_active_time_minutes", 0)
-            total_tracked_minutes = activity_json.get("total_tracked_time_minutes", 0)
-            activity_rate = activity_json.get("activity_rate_percentage", 0)
-            productivity_score = activity_json.get("summary", {}).get("productivity_score", 0)
-
-            # Update or create activity summary
-            existing_summary = db.query(EmployeeActivitySummary).filter(
-                EmployeeActivitySummary.username == username,
-                EmployeeActivitySummary.date == date_str
-            ).first()
-
-            if existing_summary:
-                # Update existing record
-                existing_summary.total_active_minutes = total_active_minutes
-                existing_summary.total_tracked_minutes = total_tracked_minutes
-                existing_summary.activity_rate_percentage = int(activity_rate)
-                existing_summary.productivity_score = int(productivity_score)
-                existing_summary.apps_used_count = activity_json.get("summary", {}).get("apps_used_count", 0)
-                existing_summary.websites_visited_count = activity_json.get("summary", {}).get("websites_visited_count", 0)
-                existing_summary.browser_events_count = activity_json.get("browser_events_total", 0)
-                existing_summary.activitywatch_available = activity_json.get("activitywatch_available", False)
-                existing_summary.app_usage_data = json.dumps(activity_json.get("our_app_usage_minutes", {}))
-                existing_summary.website_usage_data = json.dumps(activity_json.get("browser_activity_counts", {}))
-                existing_summary.activitywatch_data = json.dumps(activity_json.get("activitywatch_data", {}))
-                existing_summary.network_location_data = json.dumps({
-                    "network": activity_json.get("network_info", {}),
-                    "location": activity_json.get("location_info", {})
-                })
-                existing_summary.updated_at = timestamp
-            else:
-                # Create new summary record
-                activity_summary = EmployeeActivitySummary(
-                    username=username,
-                    date=date_str,
-                    total_active_minutes=total_active_minutes,
-                    total_tracked_minutes=total_tracked_minutes,
-                    activity_rate_percentage=int(activity_rate),
-                    productivity_score=int(productivity_score),
-                    apps_used_count=activity_json.get("summary", {}).get("apps_used_count", 0),
-                    websites_visited_count=activity_json.get("summary", {}).get("websites_visited_count", 0),
-                    browser_events_count=activity_json.get("browser_events_total", 0),
-                    activitywatch_available=activity_json.get("activitywatch_available", False),
-                    app_usage_data=json.dumps(activity_json.get("our_app_usage_minutes", {})),
-                    website_usage_data=json.dumps(activity_json.get("browser_activity_counts", {})),
-                    activitywatch_data=json.dumps(activity_json.get("activitywatch_data", {})),
-                    network_location_data=json.dumps({
-                        "network": activity_json.get("network_info", {}),
-                        "location": activity_json.get("location_info", {})
-                    }),
-                    created_at=timestamp
-                )
-                db.add(activity_summary)
-
-            # Process hourly data if available
-            keyboard_mouse_events = activity_json.get("keyboard_mouse_events", [])
-            current_hour = timestamp.hour
-
-            # Calculate hourly activity
-            hourly_active = 0
-            hourly_idle = 0
-
-            for event in keyboard_mouse_events:
-                try:
-                    event_time = datetime.fromisoformat(event.get("timestamp", ""))
-                    if event_time.hour == current_hour:
-                        if event.get("is_active", False):
-                            hourly_active += 1
-                        else:
-                            hourly_idle += 1
-                except:
-                    pass
-
-            # Get top app and website for current hour
-            app_usage = activity_json.get("our_app_usage_minutes", {})
-            website_usage = activity_json.get("browser_activity_counts", {})
-
-            top_app = max(app_usage.keys(), key=lambda k: app_usage[k]) if app_usage else ""
-            top_website = max(website_usage.keys(), key=lambda k: website_usage[k]) if website_usage else ""
-
-            # Update or create hourly record
-            existing_hourly = db.query(EmployeeHourlyActivity).filter(
-                EmployeeHourlyActivity.username == username,
-                EmployeeHourlyActivity.date == date_str,
-                EmployeeHourlyActivity.hour == current_hour
-            ).first()
-
-            if existing_hourly:
-                existing_hourly.active_minutes = hourly_active
-                existing_hourly.idle_minutes = hourly_idle
-                existing_hourly.top_app = top_app
-                existing_hourly.top_website = top_website
-                existing_hourly.keyboard_mouse_events = len(keyboard_mouse_events)
-            else:
-                hourly_activity = EmployeeHourlyActivity(
-                    username=username,
-                    date=date_str,
-                    hour=current_hour,
-                    active_minutes=hourly_active,
-                    idle_minutes=hourly_idle,
-                    top_app=top_app,
-                    top_website=top_website,
-                    keyboard_mouse_events=len(keyboard_mouse_events),
-                    created_at=timestamp
-                )
-                db.add(hourly_activity)
+        # The handler runs on the event loop; only the disk copy goes to a worker thread
+        size = await run_in_threadpool(_save_upload, screenshot.file, upload_path)
+        print(f"Screenshot saved, size: {size} bytes")
 
-        except Exception as e:
-            print(f"Error processing activity data: {e}")
-            # Continue with basic log saving even if activity processing fails
-
-        # Save detailed log
-        log_record = EmployeeLog(
-            username=username,
-            hostname=hostname,
-            employee_id=employee_id or "",
-            employee_email=employee_email or "",
-            employee_name=employee_name or "",
-            department=department or "",
-            manager=manager or "",
-            local_ip=local_ip,
-            public_ip=public_ip,
-            location=location,
-            screenshot_path=screenshot_path,
-            timestamp=timestamp,
-            activity_data=activity_data
+        # The agent only needs to know the upload arrived; summaries and the
+        # log row are written after the response is sent
+        background_tasks.add_task(
+            _persist_log, username, hostname, employee_id, employee_email, employee_name,
+            department, manager, local_ip, public_ip, location, activity_data,
+            screenshot_path, timestamp, upload_path
         )
 
-        print(f"Saving log record to database...")
-        db.add(log_record)
-        db.commit()
-        print(f"Log record and activity summaries saved successfully with ID: {log_record.id}")
-
         return {
             "status": "success",
-            "message": "Comprehensive detailed log received and processed",
+            "message": "Detailed log received",
             "screenshot_saved": filename,
-            "log_id": log_record.id,
-            "activity_summary_updated": True
+            "screenshot_url": sign_screenshot_url(filename)
         }
 
     except Exception as e:
         print(f"Error processing detailed log: {e}")
         import traceback
         traceback.print_exc()
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to process log: {str(e)}")
 
+def _transcode_screenshot(upload_path: str, screenshot_path: str):
+    """Re-encode an uploaded screenshot as WebP, keeping the original bytes if that fails"""
+    try:
+        with Image.open(upload_path) as image:
+            image.save(screenshot_path, "WEBP", quality=SCREENSHOT_WEBP_QUALITY, method=4)
+        os.remove(upload_path)
+    except Exception as e:
+        print(f"WebP transcode failed for {upload_path}, storing original: {e}")
+        os.replace(upload_path, screenshot_path)
+
+def _persist_log(username, hostname, employee_id, employee_email, employee_name, department, manager,
+                 local_ip, public_ip, location, activity_data, screenshot_path, timestamp, upload_path):
+    """Write the activity summary, hourly activity and log rows for one upload"""
+    if upload_path != screenshot_path:
+        _transcode_screenshot(upload_path, screenshot_path)
+
+    with SessionLocal() as db:
+        try:
+            # Parse and process comprehensive activity data
+            try:
+                activity_json = orjson.loads(activity_data)
+
+                # Extract summary data
+                date_str = activity_json.get("date", timestamp.date().isoformat())
+                total_active_minutes = activity_json.get("total_active_time_minutes", 0)
+                total_tracked_minutes = activity_json.get("total_tracked_time_minutes", 0)
+                activity_rate = activity_json.get("activity_rate_percentage", 0)
+                productivity_score = activity_json.get("summary", {}).get("productivity_score", 0)
+
+                # Update or create activity summary
+                existing_summary = db.query(EmployeeActivitySummary).filter(
+                    EmployeeActivitySummary.username == username,
+                    EmployeeActivitySummary.date == date_str
+                ).first()
+
+                if existing_summary:
+                    # Update existing record
+                    existing_summary.total_active_minutes = total_active_minutes
+                    existing_summary.total_tracked_minutes = total_tracked_minutes
+                    existing_summary.activity_rate_percentage = int(activity_rate)
+                    existing_summary.productivity_score = int(productivity_score)
+                    existing_summary.apps_used_count = activity_json.get("summary", {}).get("apps_used_count", 0)
+                    existing_summary.websites_visited_count = activity_json.get("summary", {}).get("websites_visited_count", 0)
+                    existing_summary.browser_events_count = activity_json.get("browser_events_total", 0)
+                    existing_summary.activitywatch_available = activity_json.get("activitywatch_available", False)
+                    existing_summary.app_usage_data = orjson.dumps(activity_json.get("our_app_usage_minutes", {})).decode()
+                    existing_summary.website_usage_data = orjson.dumps(activity_json.get("browser_activity_counts", {})).decode()
+                    existing_summary.activitywatch_data = orjson.dumps(activity_json.get("activitywatch_data", {})).decode()
+                    existing_summary.network_location_data = orjson.dumps({
+                        "network": activity_json.get("network_info", {}),
+                        "location": activity_json.get("location_info", {})
+                    }).decode()
+                    existing_summary.updated_at = timestamp
+                else:
+                    # Create new summary record
+                    activity_summary = EmployeeActivitySummary(
+                        username=username,
+                        date=date_str,
+                        total_active_minutes=total_active_minutes,
+                        total_tracked_minutes=total_tracked_minutes,
+                        activity_rate_percentage=int(activity_rate),
+                        productivity_score=int(productivity_score),
+                        apps_used_count=activity_json.get("summary", {}).get("apps_used_count", 0),
+                        websites_visited_count=activity_json.get("summary", {}).get("websites_visited_count", 0),
+                        browser_events_count=activity_json.get("browser_events_total", 0),
+                        activitywatch_available=activity_json.get("activitywatch_available", False),
+                        app_usage_data=orjson.dumps(activity_json.get("our_app_usage_minutes", {})).decode(),
+                        website_usage_data=orjson.dumps(activity_json.get("browser_activity_counts", {})).decode(),
+                        activitywatch_data=orjson.dumps(activity_json.get("activitywatch_data", {})).decode(),
+                        network_location_data=orjson.dumps({
+                            "network": activity_json.get("network_info", {}),
+                            "location": activity_json.get("location_info", {})
+                        }).decode(),
+                        created_at=timestamp
+                    )
+                    db.add(activity_summary)
+
+                # Process hourly data if available
+                keyboard_mouse_events = activity_json.get("keyboard_mouse_events", [])
+                current_hour = timestamp.hour
+
+                # Calculate hourly activity
+                hourly_active = 0
+                hourly_idle = 0
+
+                for event in keyboard_mouse_events:
+                    try:
+                        event_time = datetime.fromisoformat(event.get("timestamp", ""))
+                        if event_time.hour == current_hour:
+                            if event.get("is_active", False):
+                                hourly_active += 1
+                            else:
+                                hourly_idle += 1
+                    except:
+                        pass
+
+                # Get top app and website for current hour
+                app_usage = activity_json.get("our_app_usage_minutes", {})
+                website_usage = activity_json.get("browser_activity_counts", {})
+
+                top_app = max(app_usage.keys(), key=lambda k: app_usage[k]) if app_usage else ""
+                top_website = max(website_usage.keys(), key=lambda k: website_usage[k]) if website_usage else ""
+
+                # Update or create hourly record
+                existing_hourly = db.query(EmployeeHourlyActivity).filter(
+                    EmployeeHourlyActivity.username == username,
+                    EmployeeHourlyActivity.date == date_str,
+                    EmployeeHourlyActivity.hour == current_hour
+                ).first()
+
+                if existing_hourly:
+                    existing_hourly.active_minutes = hourly_active
+                    existing_hourly.idle_minutes = hourly_idle
+                    existing_hourly.top_app = top_app
+                    existing_hourly.top_website = top_website
+                    existing_hourly.keyboard_mouse_events = len(keyboard_mouse_events)
+                else:
+                    hourly_activity = EmployeeHourlyActivity(
+                        username=username,
+                        date=date_str,
+                        hour=current_hour,
+                        active_minutes=hourly_active,
+                        idle_minutes=hourly_idle,
+                        top_app=top_app,
+                        top_website=top_website,
+                        keyboard_mouse_events=len(keyboard_mouse_events),
+                        created_at=timestamp
+                    )
+                    db.add(hourly_activity)
+
+            except Exception as e:
+                print(f"Error processing activity data: {e}")
+                # Continue with basic log saving even if activity processing fails
+
+            # Location is stored as a JSON object rather than the agent's string
+            try:
+                location_data = orjson.loads(location) if location else None
+            except orjson.JSONDecodeError:
+                print(f"Ignoring malformed location from {username}: {location}")
+                location_data = None
+            if not isinstance(location_data, dict):
+                location_data = None
+
+            # Save detailed log
+            log_record = EmployeeLog(
+                username=username,
+                hostname=hostname,
+                employee_id=employee_id or "",
+                employee_email=employee_email or "",
+                employee_name=employee_name or "",
+                department=department or "",
+                manager=manager or "",
+                local_ip=local_ip,
+                public_ip=public_ip,
+                location=location_data,
+                screenshot_path=screenshot_path,
+                timestamp=timestamp,
+                activity_data=activity_data
+            )
+
+            print(f"Saving log record to database...")
+            db.add(log_record)
+            db.commit()
+            print(f"Log record and activity summaries saved successfully with ID: {log_record.id}")
+        except Exception as e:
+            print(f"Error saving detailed log from {username}: {e}")
+            import traceback
+            traceback.print_exc()
+            db.rollback()
+
 # Admin authentication
+def _find_admin(username: str):
+    with SessionLocal() as db:
+        return db.execute(
+            select(AdminUser.id, AdminUser.username, AdminUser.hashed_password).where(AdminUser.username == username)
+        ).first()
+
 @app.post("/api/admin/login")
-def admin_login(login_data: AdminLogin, db: Session = Depends(get_db)):
+async def admin_login(login_data: AdminLogin):
     """Admin login endpoint"""
     try:
         print(f"Login attempt for username: {login_data.username}")
-        admin = db.query(AdminUser).filter(AdminUser.username == login_data.username).first()
-
-        if not admin:
-            print(f"Admin user not found: {login_data.username}")
-            raise HTTPException(status_code=401, detail="Incorrect username or password")
-
-        if not verify_password(login_data.password, admin.hashed_password):
-            print(f"Password verification failed for: {login_data.username}")
+        # DB lookup and bcrypt run off the event loop, bcrypt on its own pool
+        admin = await run_in_threadpool(_find_admin, login_data.username)
+
+        # An unknown username is still checked, against a dummy hash, so both
+        # failures take the same time
+        password_ok = await verify_password_async(login_data.password, admin.hashed_password if admin else None)
+        if not admin or not password_ok:
+            print(f"Login failed for: {login_data.username} ({'wrong password' if admin else 'no such user'})")
             raise HTTPException(status_code=401, detail="Incorrect username or password")
 
         print(f"Login successful for: {login_data.username}")
-        access_token = create_access_token(data={"sub": admin.username})
+        access_token = create_access_token(data={"sub": admin.username, "uid": admin.id})
         return {"access_token": access_token, "token_type": "bearer"}
 
     except HTTPException:
@@ -374,51 +620,55 @@ def debug_admin_user(db: Session = Depends(get_db)):
             "database_connected": False
         }
 
+def _parse_date(value: Optional[str]) -> date:
+    """YYYY-MM-DD query value, defaulting to today (UTC)"""
+    return date.fromisoformat(value) if value else datetime.utcnow().date()
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
 # Admin dashboard endpoints  
 @app.get("/api/admin/employees/enhanced")
 def get_enhanced_employee_data(admin=Depends(verify_admin_token), db: Session = Depends(get_db)):
     """Get enhanced employee data with working hours and productivity for today"""
-    today = datetime.utcnow().date()
-    start_of_day = datetime.combine(today, datetime.min.time())
+    now = datetime.utcnow()
+    start_of_day = _day_start(now.date())
     end_of_day = start_of_day + timedelta(days=1)
 
-    # Get all employees who have any activity
-    all_employees = db.query(EmployeeHeartbeat.username).distinct().all()
+    # Every employee with their latest heartbeat (presence), latest log and
+    # today's heartbeat times, in three queries regardless of headcount
+    all_employees = db.query(EmployeePresence.username, EmployeePresence.last_seen).order_by(
+        EmployeePresence.username
+    ).all()
+    logs_by_user = {log.username: log for log in latest_logs(db)}
 
+    today_by_user = {}
+    for username, timestamp in db.query(EmployeeHeartbeat.username, EmployeeHeartbeat.timestamp).filter(
+        EmployeeHeartbeat.timestamp >= start_of_day,
+        EmployeeHeartbeat.timestamp < end_of_day
+    ).order_by(EmployeeHeartbeat.username, EmployeeHeartbeat.timestamp):
+        today_by_user.setdefault(username, []).append(timestamp)
+
+    cutoff_time = now - timedelta(minutes=10)
     enhanced_data = []
     employee_id = 1
 
-    for (username,) in all_employees:
-        # Get today's heartbeats
-        heartbeats = db.query(EmployeeHeartbeat).filter(
-            EmployeeHeartbeat.username == username,
-            EmployeeHeartbeat.timestamp >= start_of_day,
-            EmployeeHeartbeat.timestamp < end_of_day
-        ).order_by(EmployeeHeartbeat.timestamp).all()
-
-        # Get latest heartbeat for status
-        latest_heartbeat = db.query(EmployeeHeartbeat).filter(
-            EmployeeHeartbeat.username == username
-        ).order_by(desc(EmployeeHeartbeat.timestamp)).first()
-
-        # Get latest log for location
-        latest_log = db.query(EmployeeLog).filter(
-            EmployeeLog.username == username
-        ).order_by(desc(EmployeeLog.timestamp)).first()
+    for username, last_seen in all_employees:
+        heartbeats = today_by_user.get(username, [])
+        latest_log = logs_by_user.get(username)
 
         # Determine status
-        cutoff_time = datetime.utcnow() - timedelta(minutes=10)
-        status = "online" if latest_heartbeat and latest_heartbeat.timestamp > cutoff_time else "offline"
+        status = "online" if last_seen > cutoff_time else "offline"
 
         # Calculate working hours and times
         if heartbeats:
-            first_activity = heartbeats[0].timestamp
-            last_activity = heartbeats[-1].timestamp
+            first_activity = heartbeats[0]
+            last_activity = heartbeats[-1]
 
             # Calculate active time (sum of gaps <= 15 minutes)
             active_seconds = 0
             for i in range(len(heartbeats) - 1):
-                gap = (heartbeats[i + 1].timestamp - heartbeats[i].timestamp).total_seconds()
+                gap = (heartbeats[i + 1] - heartbeats[i]).total_seconds()
                 if gap <= 900:  # 15 minutes
                     active_seconds += gap
 
@@ -436,17 +686,11 @@ def get_enhanced_employee_data(admin=Depends(verify_admin_token), db: Session =
         # Parse location and determine work location
         location_text = "Remote work"
         public_ip = "Unknown"
-        if latest_log and latest_log.location:
-            try:
-                location_data = json.loads(latest_log.location)
-                public_ip = location_data.get('ip', 'Unknown')
-                # Check if this is the office IP
-                if public_ip == "14.96.131.106":
-                    location_text = "Office Bangalore"
-                else:
-                    location_text = "Remote work"
-            except:
-                pass
+        if latest_log and isinstance(latest_log.location, dict):
+            public_ip = latest_log.location.get('ip', 'Unknown')
+            # Check if this is the office IP
+            if public_ip == "14.96.131.106":
+                location_text = "Office Bangalore"
 
         enhanced_data.append({
             "id": f"D{employee_id:03d}",
@@ -458,7 +702,7 @@ def get_enhanced_employee_data(admin=Depends(verify_admin_token), db: Session =
             "productivity": f"{int(productivity)}%" if productivity > 0 else "--",
             "public_ip": public_ip,
             "location": location_text,
-            "last_seen": latest_heartbeat.timestamp if latest_heartbeat else None,
+            "last_seen": last_seen,
             "raw_hours": working_hours,
             "raw_productivity": productivity
         })
@@ -477,7 +721,7 @@ def get_enhanced_employee_data(admin=Depends(verify_admin_token), db: Session =
     online_office = [emp for emp in office_employees if emp['status'] == 'online']
     online_remote = [emp for emp in remote_employees if emp['status'] == 'online']
 
-    return {
+    return ORJSONResponse({
         "employees": enhanced_data,
         "dashboard_stats": {
             "total_employees": total_employees,
@@ -492,26 +736,36 @@ def get_enhanced_employee_data(admin=Depends(verify_admin_token), db: Session =
                 "remote_percentage": round((len(remote_employees) / total_employees * 100)) if total_employees > 0 else 0
             }
         }
-    }
+    })
 
-@app.get("/api/admin/employees/status")
-def get_employee_status(admin=Depends(verify_admin_token), db: Session = Depends(get_db)):
+@app.get("/api/admin/employees/status", response_model=EmployeeStatusList)
+def get_employee_status(response: Response, admin=Depends(verify_admin_token), db: Session = Depends(get_db)):
     """Get current online status of all employees with location details"""
-    try:
-        # Get latest heartbeat for each employee - simplified query
-        current_status = []
+    # Dashboards poll this endpoint; serve concurrent polls from one query
+    response.headers["Cache-Control"] = f"private, max-age={STATUS_CACHE_TTL}"
+    return get_or_compute(status_cache, "status", lambda: _load_employee_status(db))
 
-        # Get all unique usernames first
-        usernames = db.query(EmployeeHeartbeat.username).distinct().all()
-
-        for (username,) in usernames:
-            # Get the latest heartbeat for each user
-            latest_heartbeat = db.query(EmployeeHeartbeat).filter(
-                EmployeeHeartbeat.username == username
-            ).order_by(desc(EmployeeHeartbeat.timestamp)).first()
-
-            if latest_heartbeat:
-                current_status.append(latest_heartbeat)
+def _load_employee_status(db: Session, limit: Optional[int] = None):
+    # Online if heartbeat within last 10 minutes; compared in SQL
+    cutoff_time = datetime.utcnow() - timedelta(minutes=10)
+    try:
+        # One presence row per employee, kept current by the heartbeat flusher
+        query = db.query(
+            EmployeePresence.username,
+            EmployeePresence.hostname,
+            EmployeePresence.last_seen,
+            (EmployeePresence.last_seen > cutoff_time).label("is_online")
+        )
+        if limit is None:
+            current_status = query.order_by(EmployeePresence.username).all()
+            logs_by_user = {log.username: log for log in latest_logs(db)}
+        else:
+            # Most recently seen employees only, with just their latest logs
+            current_status = query.order_by(desc(EmployeePresence.last_seen)).limit(limit).all()
+            logs_by_user = {
+                log.username: log
+                for log in latest_logs(db, [presence.username for presence in current_status])
+            }
 
     except Exception as e:
         print(f"Database error in get_employee_status: {e}")
@@ -519,18 +773,13 @@ def get_employee_status(admin=Depends(verify_admin_token), db: Session = Depends
         traceback.print_exc()
         # Return empty result if database query fails
         current_status = []
+        logs_by_user = {}
 
-    # Determine online status (online if heartbeat within last 10 minutes)
-    cutoff_time = datetime.utcnow() - timedelta(minutes=10)
     employees = []
 
-    for heartbeat in current_status:
-        is_online = heartbeat.timestamp > cutoff_time
-
-        # Get latest log entry for location details
-        latest_log = db.query(EmployeeLog).filter(
-            EmployeeLog.username == heartbeat.username
-        ).order_by(desc(EmployeeLog.timestamp)).first()
+    for presence in current_status:
+        # Latest log entry for location details
+        latest_log = logs_by_user.get(presence.username)
 
         # Parse location data if available
         public_ip = "Unknown"
@@ -538,22 +787,19 @@ def get_employee_status(admin=Depends(verify_admin_token), db: Session = Depends
         state = "Unknown"
         country = "Unknown"
 
-        if latest_log and latest_log.location:
-            try:
-                location_data = json.loads(latest_log.location)
-                public_ip = location_data.get('ip', 'Unknown')
-                city = location_data.get('city', 'Unknown')
-                state = location_data.get('region', 'Unknown')
-                country = location_data.get('country', 'Unknown')
-            except (json.JSONDecodeError, AttributeError):
-                pass
+        if latest_log and isinstance(latest_log.location, dict):
+            location_data = latest_log.location
+            public_ip = location_data.get('ip', 'Unknown')
+            city = location_data.get('city', 'Unknown')
+            state = location_data.get('region', 'Unknown')
+            country = location_data.get('country', 'Unknown')
 
         employees.append({
-            "username": heartbeat.username,
-            "hostname": heartbeat.hostname,
-            "status": "online" if is_online else "offline",
-            "last_seen": heartbeat.timestamp,
-            "last_heartbeat": heartbeat.timestamp,
+            "username": presence.username,
+            "hostname": presence.hostname,
+            "status": "online" if presence.is_online else "offline",
+            "last_seen": presence.last_seen,
+            "last_heartbeat": presence.last_seen,
             "public_ip": public_ip,
             "city": city,
             "state": state,
@@ -563,6 +809,76 @@ def get_employee_status(admin=Depends(verify_admin_token), db: Session = Depends
 
     return {"employees": employees}
 
+@app.websocket("/ws/admin/employees")
+async def employee_status_updates(websocket: WebSocket, token: Optional[str] = None):
+    """Push online/offline changes to the dashboard; browsers can't set headers on
+    a WebSocket, so the access token comes as ?token="""
+    try:
+        await verify_admin_jwt(token or "")
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    status_broadcast.connect(websocket)
+    try:
+        # Nothing is expected from the client; this just waits for it to go away
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        status_broadcast.disconnect(websocket)
+
+# Employees listed in the dashboard's recent activity panel
+RECENT_ACTIVITY_LIMIT = 20
+
+@app.get("/api/admin/employees/stats", response_model=EmployeeStats)
+def get_employee_stats(response: Response, admin=Depends(verify_admin_token), db: Session = Depends(get_db)):
+    """Online/offline counts and the most recently seen employees, for the dashboard tiles"""
+    response.headers["Cache-Control"] = f"private, max-age={STATUS_CACHE_TTL}"
+    return get_or_compute(status_cache, "stats", lambda: _load_employee_stats(db))
+
+def _load_employee_stats(db: Session):
+    cutoff_time = datetime.utcnow() - timedelta(minutes=10)
+    total, online = db.query(
+        func.count(EmployeePresence.username),
+        func.count(EmployeePresence.username).filter(EmployeePresence.last_seen > cutoff_time)
+    ).one()
+
+    return {
+        "total": total,
+        "online": online,
+        "offline": total - online,
+        "recent": _load_employee_status(db, limit=RECENT_ACTIVITY_LIMIT)["employees"]
+    }
+
+@app.get("/api/admin/summary")
+def get_dashboard_summary(response: Response, admin=Depends(verify_admin_token), db: Session = Depends(get_db)):
+    """Headline employee and activity counts for the dashboard, in one query"""
+    response.headers["Cache-Control"] = f"private, max-age={STATUS_CACHE_TTL}"
+    return get_or_compute(status_cache, "summary", lambda: _load_dashboard_summary(db))
+
+def _load_dashboard_summary(db: Session):
+    now = datetime.utcnow()
+    cutoff_time = now - timedelta(minutes=10)
+    logs_today = select(func.count(EmployeeLog.id)).where(
+        EmployeeLog.timestamp >= _day_start(now.date())
+    ).scalar_subquery()
+    total, online, log_count = db.query(
+        func.count(EmployeePresence.username),
+        func.count(EmployeePresence.username).filter(EmployeePresence.last_seen > cutoff_time),
+        logs_today
+    ).one()
+
+    return {
+        "total_employees": total,
+        "online": online,
+        "offline": total - online,
+        "online_rate": round(online / total * 100) if total else 0,
+        "logs_today": log_count
+    }
+
 @app.get("/api/admin/employees/{username}/day-details")
 def get_employee_day_details(
     username: str,
@@ -571,10 +887,7 @@ def get_employee_day_details(
     db: Session = Depends(get_db)
 ):
     """Get comprehensive day details for a specific employee"""
-    if date:
-        target_date = datetime.strptime(date, "%Y-%m-%d").date()
-    else:
-        target_date = datetime.utcnow().date()
+    target_date = _parse_date(date)
 
     date_str = target_date.isoformat()
 
@@ -584,83 +897,67 @@ def get_employee_day_details(
         EmployeeActivitySummary.date == date_str
     ).first()
 
-    # Get hourly data
-    hourly_data = db.query(EmployeeHourlyActivity).filter(
-        EmployeeHourlyActivity.username == username,
-        EmployeeHourlyActivity.date == date_str
-    ).order_by(EmployeeHourlyActivity.hour).all()
-
-    # Get heartbeats for the day
-    start_of_day = datetime.combine(target_date, datetime.min.time())
-    end_of_day = start_of_day + timedelta(days=1)
-
-    heartbeats = db.query(EmployeeHeartbeat).filter(
-        EmployeeHeartbeat.username == username,
-        EmployeeHeartbeat.timestamp >= start_of_day,
-        EmployeeHeartbeat.timestamp < end_of_day
-    ).order_by(EmployeeHeartbeat.timestamp).all()
-
-    # Get detailed logs for the day
-    detailed_logs = db.query(EmployeeLog).filter(
-        EmployeeLog.username == username,
-        EmployeeLog.timestamp >= start_of_day,
-        EmployeeLog.timestamp < end_of_day
-    ).order_by(EmployeeLog.timestamp).all()
-
     # Process data for response
     if not activity_summary:
-        return {
+        return ORJSONResponse({
             "username": username,
             "date": date_str,
             "data_available": False,
             "message": "No comprehensive activity data available for this date"
-        }
+        })
 
     # Parse comprehensive data
     try:
-        app_usage = json.loads(activity_summary.app_usage_data)
-        website_usage = json.loads(activity_summary.website_usage_data)
-        activitywatch_data = json.loads(activity_summary.activitywatch_data)
-        network_location = json.loads(activity_summary.network_location_data)
+        app_usage = orjson.loads(activity_summary.app_usage_data)
+        website_usage = orjson.loads(activity_summary.website_usage_data)
+        activitywatch_data = orjson.loads(activity_summary.activitywatch_data)
+        network_location = orjson.loads(activity_summary.network_location_data)
     except:
         app_usage = {}
         website_usage = {}
         activitywatch_data = {}
         network_location = {}
 
-    # Format hourly breakdown
-    hourly_breakdown = []
-    for hour_data in hourly_data:
-        hourly_breakdown.append({
-            "hour": hour_data.hour,
-            "active_minutes": hour_data.active_minutes,
-            "idle_minutes": hour_data.idle_minutes,
-            "top_app": hour_data.top_app,
-            "top_website": hour_data.top_website,
-            "keyboard_mouse_events": hour_data.keyboard_mouse_events,
-            "screen_locked": hour_data.screen_locked
-        })
+    # The rest is read as plain column rows; nothing here needs ORM objects
+    hourly_breakdown = [row._asdict() for row in db.query(
+        EmployeeHourlyActivity.hour, EmployeeHourlyActivity.active_minutes, EmployeeHourlyActivity.idle_minutes,
+        EmployeeHourlyActivity.top_app, EmployeeHourlyActivity.top_website,
+        EmployeeHourlyActivity.keyboard_mouse_events, EmployeeHourlyActivity.screen_locked
+    ).filter(
+        EmployeeHourlyActivity.username == username,
+        EmployeeHourlyActivity.date == date_str
+    ).order_by(EmployeeHourlyActivity.hour)]
 
-    # Format heartbeat timeline
-    heartbeat_timeline = []
-    for hb in heartbeats:
-        heartbeat_timeline.append({
-            "timestamp": hb.timestamp,
-            "status": hb.status,
-            "hostname": hb.hostname
-        })
+    heartbeat_timeline = [row._asdict() for row in db.query(
+        EmployeeHeartbeat.timestamp, EmployeeHeartbeat.status, EmployeeHeartbeat.hostname
+    ).filter(
+        EmployeeHeartbeat.username == username,
+        heartbeats_on_day(target_date)
+    ).order_by(EmployeeHeartbeat.timestamp)]
 
     # Format detailed logs
+    start_of_day = _day_start(target_date)
+    end_of_day = start_of_day + timedelta(days=1)
+    detailed_logs = db.query(
+        EmployeeLog.timestamp, EmployeeLog.screenshot_path, EmployeeLog.location,
+        EmployeeLog.local_ip, EmployeeLog.public_ip, EmployeeLog.activity_data
+    ).filter(
+        EmployeeLog.username == username,
+        EmployeeLog.timestamp >= start_of_day,
+        EmployeeLog.timestamp < end_of_day
+    ).order_by(EmployeeLog.timestamp)
+
     log_entries = []
     for log in detailed_logs:
         try:
-            activity_data = json.loads(log.activity_data) if log.activity_data else {}
+            activity_data = orjson.loads(log.activity_data) if log.activity_data else {}
         except:
             activity_data = {}
 
         log_entries.append({
             "timestamp": log.timestamp,
             "screenshot_path": log.screenshot_path,
+            "screenshot_url": sign_screenshot_url(os.path.basename(log.screenshot_path)) if log.screenshot_path else None,
             "location": log.location,
             "network_info": {
                 "local_ip": log.local_ip,
@@ -671,7 +968,7 @@ def get_employee_day_details(
             "websites_tracked": len(activity_data.get("browser_activity_counts", {}))
         })
 
-    return {
+    return ORJSONResponse({
         "username": username,
         "date": date_str,
         "data_available": True,
@@ -692,23 +989,55 @@ def get_employee_day_details(
         "heartbeat_timeline": heartbeat_timeline,
         "detailed_logs": log_entries,
         "work_location": "Office" if network_location.get("network", {}).get("public_ip") == "14.96.131.106" else "Remote"
-    }
+    })
+
+MAX_LOGS_PAGE_SIZE = 200
 
 @app.get("/api/admin/employees/{username}/logs")
 def get_employee_logs(
     username: str,
     days: int = 7,
+    limit: int = 100,
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     admin=Depends(verify_admin_token),
     db: Session = Depends(get_db)
 ):
-    """Get detailed logs for a specific employee"""
+    """Get detailed logs for a specific employee, newest first, one page at a time"""
+    limit = max(1, min(limit, MAX_LOGS_PAGE_SIZE))
     cutoff_date = datetime.utcnow() - timedelta(days=days)
-    logs = db.query(EmployeeLog).filter(
+    # Only the columns the dashboard renders; served by ix_log_user_ts
+    query = db.query(
+        EmployeeLog.id, EmployeeLog.timestamp, EmployeeLog.hostname, EmployeeLog.local_ip,
+        EmployeeLog.public_ip, EmployeeLog.location, EmployeeLog.screenshot_path, EmployeeLog.activity_data
+    ).filter(
         EmployeeLog.username == username,
         EmployeeLog.timestamp > cutoff_date
-    ).order_by(desc(EmployeeLog.timestamp)).all()
-
-    return {"username": username, "logs": logs}
+    )
+    # Keyset on (timestamp, id), so rows sharing a timestamp across a page
+    # boundary are neither skipped nor repeated
+    if before and before_id is not None:
+        query = query.filter(or_(
+            EmployeeLog.timestamp < before,
+            and_(EmployeeLog.timestamp == before, EmployeeLog.id < before_id)
+        ))
+    elif before:
+        query = query.filter(EmployeeLog.timestamp < before)
+    logs = [row._asdict() for row in query.order_by(
+        desc(EmployeeLog.timestamp), desc(EmployeeLog.id)
+    ).limit(limit)]
+    for log in logs:
+        path = log["screenshot_path"]
+        log["screenshot_url"] = sign_screenshot_url(os.path.basename(path)) if path else None
+
+    # Pass next_before/next_before_id back as ?before=&before_id= for the following page
+    last = logs[-1] if len(logs) == limit else None
+    return ORJSONResponse({
+        "username": username,
+        "logs": logs,
+        "next_before": last["timestamp"] if last else None,
+        "next_before_id": last["id"] if last else None
+    })
 
 @app.get("/api/admin/employees/{username}/working-hours")
 def get_working_hours(
@@ -718,21 +1047,18 @@ def get_working_hours(
     db: Session = Depends(get_db)
 ):
     """Calculate working hours for an employee based on heartbeats"""
-    if date:
-        target_date = datetime.strptime(date, "%Y-%m-%d").date()
-    else:
-        target_date = datetime.utcnow().date()
+    target_date = _parse_date(date)
 
-    start_of_day = datetime.combine(target_date, datetime.min.time())
-    end_of_day = start_of_day + timedelta(days=1)
-
-    heartbeats = db.query(EmployeeHeartbeat).filter(
+    first_heartbeat, last_heartbeat, heartbeat_count = db.query(
+        func.min(EmployeeHeartbeat.timestamp),
+        func.max(EmployeeHeartbeat.timestamp),
+        func.count(EmployeeHeartbeat.id)
+    ).filter(
         EmployeeHeartbeat.username == username,
-        EmployeeHeartbeat.timestamp >= start_of_day,
-        EmployeeHeartbeat.timestamp < end_of_day
-    ).order_by(EmployeeHeartbeat.timestamp).all()
+        heartbeats_on_day(target_date)
+    ).one()
 
-    if not heartbeats:
+    if not heartbeat_count:
         return {
             "username": username,
             "date": target_date.isoformat(),
@@ -741,9 +1067,6 @@ def get_working_hours(
             "last_seen": None
         }
 
-    first_heartbeat = heartbeats[0].timestamp
-    last_heartbeat = heartbeats[-1].timestamp
-
     # Calculate working hours (assuming continuous work between first and last heartbeat)
     total_seconds = (last_heartbeat - first_heartbeat).total_seconds()
     total_hours = total_seconds / 3600  # Convert to hours
@@ -761,33 +1084,51 @@ def cleanup_old_data(admin=Depends(verify_admin_token), db: Session = Depends(ge
     """Clean up data older than 45 days"""
     cutoff_date = datetime.utcnow() - timedelta(days=45)
 
-    # Delete old heartbeats
+    # Delete old heartbeats; partitioned Postgres tables drop whole days instead
+    dropped_partitions = drop_heartbeat_partitions(cutoff_date)
+    if dropped_partitions is not None:
+        ensure_heartbeat_partitions()
     old_heartbeats = db.query(EmployeeHeartbeat).filter(
         EmployeeHeartbeat.timestamp < cutoff_date
-    ).delete()
-
-    # Delete old logs and their screenshots
-    old_logs = db.query(EmployeeLog).filter(
-        EmployeeLog.timestamp < cutoff_date
-    ).all()
+    ).delete(synchronize_session=False)
+
+    # Delete old logs and collect their screenshot paths in the same statement
+    # where the database supports DELETE ... RETURNING
+    if db.get_bind().dialect.delete_returning:
+        deleted_paths = db.execute(
+            delete(EmployeeLog).where(
+                EmployeeLog.timestamp < cutoff_date
+            ).returning(EmployeeLog.screenshot_path)
+        ).scalars().all()
+    else:
+        deleted_paths = [path for (path,) in db.query(EmployeeLog.screenshot_path).filter(
+            EmployeeLog.timestamp < cutoff_date
+        )]
+        db.query(EmployeeLog).filter(
+            EmployeeLog.timestamp < cutoff_date
+        ).delete(synchronize_session=False)
+    deleted_logs = len(deleted_paths)
+    screenshot_paths = [path for path in deleted_paths if path]
 
-    deleted_screenshots = 0
-    for log in old_logs:
-        if log.screenshot_path and os.path.exists(log.screenshot_path):
-            os.remove(log.screenshot_path)
-            deleted_screenshots += 1
+    db.commit()
+    status_cache.invalidate()
 
-    # Delete log records
-    deleted_logs = db.query(EmployeeLog).filter(
-        EmployeeLog.timestamp < cutoff_date
-    ).delete()
+    # Files go only once the rows are gone, and the unlinks run outside the
+    # transaction so they never hold locks on the log table
+    def remove_screenshot(path):
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
 
-    db.commit()
+    deleted_screenshots = sum(io_executor.map(remove_screenshot, screenshot_paths))
 
     return {
         "deleted_heartbeats": old_heartbeats,
         "deleted_logs": deleted_logs,
-        "deleted_screenshots": deleted_screenshots
+        "deleted_screenshots": deleted_screenshots,
+        "dropped_partitions": dropped_partitions or 0
     }
 
 # Enhanced reporting endpoints
@@ -798,10 +1139,7 @@ def get_daily_report(
     db: Session = Depends(get_db)
 ):
     """Get comprehensive daily activity report for all employees"""
-    if date:
-        target_date = datetime.strptime(date, "%Y-%m-%d").date()
-    else:
-        target_date = datetime.utcnow().date()
+    target_date = _parse_date(date)
 
     date_str = target_date.isoformat()
 
@@ -810,10 +1148,14 @@ def get_daily_report(
         EmployeeActivitySummary.date == date_str
     ).all()
 
-    # Get hourly data for the date
-    hourly_data = db.query(EmployeeHourlyActivity).filter(
-        EmployeeHourlyActivity.date == date_str
-    ).all()
+    # Get hourly data for the date as plain rows, grouped by employee
+    hourly_by_user = {}
+    for row in db.query(
+        EmployeeHourlyActivity.username, EmployeeHourlyActivity.hour, EmployeeHourlyActivity.active_minutes,
+        EmployeeHourlyActivity.idle_minutes, EmployeeHourlyActivity.top_app, EmployeeHourlyActivity.top_website,
+        EmployeeHourlyActivity.keyboard_mouse_events
+    ).filter(EmployeeHourlyActivity.date == date_str):
+        hourly_by_user.setdefault(row.username, []).append(row)
 
     # Process comprehensive report
     report_data = []
@@ -823,9 +1165,8 @@ def get_daily_report(
 
     for summary in activity_summaries:
         # Get user's hourly breakdown
-        user_hourly = [h for h in hourly_data if h.username == summary.username]
         hourly_breakdown = {}
-        for hour_data in user_hourly:
+        for hour_data in hourly_by_user.get(summary.username, []):
             hourly_breakdown[hour_data.hour] = {
                 "active_minutes": hour_data.active_minutes,
                 "idle_minutes": hour_data.idle_minutes,
@@ -836,10 +1177,10 @@ def get_daily_report(
 
         # Parse app and website usage
         try:
-            app_usage = json.loads(summary.app_usage_data)
-            website_usage = json.loads(summary.website_usage_data)
-            activitywatch_data = json.loads(summary.activitywatch_data)
-            network_location = json.loads(summary.network_location_data)
+            app_usage = orjson.loads(summary.app_usage_data)
+            website_usage = orjson.loads(summary.website_usage_data)
+            activitywatch_data = orjson.loads(summary.activitywatch_data)
+            network_location = orjson.loads(summary.network_location_data)
         except:
             app_usage = {}
             website_usage = {}
@@ -874,7 +1215,7 @@ def get_daily_report(
     avg_productivity = (total_productivity / len(activity_summaries)) if activity_summaries else 0
     total_employees = len(activity_summaries)
 
-    return {
+    return ORJSONResponse({
         "date": date_str,
         "total_employees_active": total_employees,
         "average_productivity_score": round(avg_productivity, 2),
@@ -882,109 +1223,7 @@ def get_daily_report(
         "activitywatch_integration_rate": round((activitywatch_users / total_employees * 100), 2) if total_employees > 0 else 0,
         "comprehensive_data_available": True,
         "employees": report_data
-    }
-
-    # Get all employees who were active on this date
-    employees_with_activity = db.query(EmployeeHeartbeat.username).filter(
-        EmployeeHeartbeat.timestamp >= start_of_day,
-        EmployeeHeartbeat.timestamp < end_of_day
-    ).distinct().all()
-
-    report_data = []
-    total_hours = 0
-
-    for (username,) in employees_with_activity:
-        # Get working hours
-        heartbeats = db.query(EmployeeHeartbeat).filter(
-            EmployeeHeartbeat.username == username,
-            EmployeeHeartbeat.timestamp >= start_of_day,
-            EmployeeHeartbeat.timestamp < end_of_day
-        ).order_by(EmployeeHeartbeat.timestamp).all()
-
-        if heartbeats:
-            first_heartbeat = heartbeats[0].timestamp
-            last_heartbeat = heartbeats[-1].timestamp
-
-            # Calculate active time (sum of gaps <= 15 minutes)
-            active_seconds = 0
-            for i in range(len(heartbeats) - 1):
-                gap = (heartbeats[i + 1].timestamp - heartbeats[i].timestamp).total_seconds()
-                if gap <= 900:  # 15 minutes
-                    active_seconds += gap
-
-            active_hours = active_seconds / 3600
-            total_span_hours = (last_heartbeat - first_heartbeat).total_seconds() / 3600
-
-            # Calculate productivity based on 8 hours requirement
-            # Simple formula: (actual_active_hours / 8) * 100
-            productivity = min((active_hours / 8.0 * 100), 100)
-
-            total_hours += active_hours
-
-            # Get detailed logs count
-            logs_count = db.query(EmployeeLog).filter(
-                EmployeeLog.username == username,
-                EmployeeLog.timestamp >= start_of_day,
-                EmployeeLog.timestamp < end_of_day
-            ).count()
-
-            report_data.append({
-                "username": username,
-                "hours_worked": round(active_hours, 2),
-                "total_span_hours": round(total_span_hours, 2),
-                "productivity": f"{int(productivity)}%",
-                "first_activity": first_heartbeat,
-                "last_activity": last_activity,
-                "heartbeats_count": len(heartbeats),
-                "logs_count": logs_count
-            })
-
-    # Calculate work location statistics for the day
-    office_employees_today = []
-    remote_employees_today = []
-
-    for employee_data in report_data:
-        # Get employee's location for this date
-        latest_log_for_date = db.query(EmployeeLog).filter(
-            EmployeeLog.username == employee_data["username"],
-            EmployeeLog.timestamp >= start_of_day,
-            EmployeeLog.timestamp < end_of_day
-        ).order_by(desc(EmployeeLog.timestamp)).first()
-
-        if latest_log_for_date and latest_log_for_date.location:
-            try:
-                location_data = json.loads(latest_log_for_date.location)
-                public_ip = location_data.get('ip', 'Unknown')
-                if public_ip == "14.96.131.106":
-                    office_employees_today.append(employee_data)
-                    employee_data["work_location"] = "Office Bangalore"
-                else:
-                    remote_employees_today.append(employee_data)
-                    employee_data["work_location"] = "Remote Work"
-            except:
-                remote_employees_today.append(employee_data)
-                employee_data["work_location"] = "Remote Work"
-        else:
-            remote_employees_today.append(employee_data)
-            employee_data["work_location"] = "Remote Work"
-
-    office_hours = sum([emp["hours_worked"] for emp in office_employees_today])
-    remote_hours = sum([emp["hours_worked"] for emp in remote_employees_today])
-
-    return {
-        "date": target_date.isoformat(),
-        "total_employees_active": len(report_data),
-        "total_hours_worked": round(total_hours, 2),
-        "average_hours_per_employee": round(total_hours / len(report_data), 2) if report_data else 0,
-        "work_location_breakdown": {
-            "office_employees": len(office_employees_today),
-            "remote_employees": len(remote_employees_today),
-            "office_hours_total": round(office_hours, 2),
-            "remote_hours_total": round(remote_hours, 2),
-            "office_percentage": round((len(office_employees_today) / len(report_data) * 100)) if report_data else 0
-        },
-        "employees": report_data
-    }
+    })
 
 @app.get("/api/admin/reports/weekly")
 def get_weekly_report(
@@ -994,53 +1233,51 @@ def get_weekly_report(
 ):
     """Get weekly activity report for all employees"""
     if start_date:
-        week_start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        week_start = _parse_date(start_date)
     else:
         today = datetime.utcnow().date()
         week_start = today - timedelta(days=today.weekday())
 
     week_end = week_start + timedelta(days=7)
-    start_datetime = datetime.combine(week_start, datetime.min.time())
-    end_datetime = datetime.combine(week_end, datetime.min.time())
-
-    # Get all employees with activity in this week
-    employees_with_activity = db.query(EmployeeHeartbeat.username).filter(
+    start_datetime = _day_start(week_start)
+    end_datetime = _day_start(week_end)
+
+    # First/last heartbeat and count per employee per day, aggregated in the DB
+    day = func.date(EmployeeHeartbeat.timestamp)
+    days_by_user = {}
+    for username, day_value, first_heartbeat, last_heartbeat, count in db.query(
+        EmployeeHeartbeat.username,
+        day,
+        func.min(EmployeeHeartbeat.timestamp),
+        func.max(EmployeeHeartbeat.timestamp),
+        func.count(EmployeeHeartbeat.id)
+    ).filter(
         EmployeeHeartbeat.timestamp >= start_datetime,
         EmployeeHeartbeat.timestamp < end_datetime
-    ).distinct().all()
+    ).group_by(EmployeeHeartbeat.username, day).order_by(EmployeeHeartbeat.username):
+        days_by_user.setdefault(username, {})[str(day_value)] = (first_heartbeat, last_heartbeat, count)
 
     report_data = []
 
-    for (username,) in employees_with_activity:
+    for username, days in days_by_user.items():
         daily_data = []
         total_week_hours = 0
 
-        # Get data for each day of the week
         for day_offset in range(7):
-            current_date = week_start + timedelta(days=day_offset)
-            day_start = datetime.combine(current_date, datetime.min.time())
-            day_end = day_start + timedelta(days=1)
-
-            heartbeats = db.query(EmployeeHeartbeat).filter(
-                EmployeeHeartbeat.username == username,
-                EmployeeHeartbeat.timestamp >= day_start,
-                EmployeeHeartbeat.timestamp < day_end
-            ).order_by(EmployeeHeartbeat.timestamp).all()
-
-            if heartbeats:
-                first_heartbeat = heartbeats[0].timestamp
-                last_heartbeat = heartbeats[-1].timestamp
+            current_date = (week_start + timedelta(days=day_offset)).isoformat()
+            if current_date in days:
+                first_heartbeat, last_heartbeat, count = days[current_date]
                 day_hours = (last_heartbeat - first_heartbeat).total_seconds() / 3600
                 total_week_hours += day_hours
 
                 daily_data.append({
-                    "date": current_date.isoformat(),
+                    "date": current_date,
                     "hours_worked": round(day_hours, 2),
-                    "heartbeats_count": len(heartbeats)
+                    "heartbeats_count": count
                 })
             else:
                 daily_data.append({
-                    "date": current_date.isoformat(),
+                    "date": current_date,
                     "hours_worked": 0,
                     "heartbeats_count": 0
                 })
@@ -1052,12 +1289,12 @@ def get_weekly_report(
             "daily_breakdown": daily_data
         })
 
-    return {
+    return ORJSONResponse({
         "week_start": week_start.isoformat(),
         "week_end": (week_end - timedelta(days=1)).isoformat(),
         "total_employees": len(report_data),
         "employees": report_data
-    }
+    })
 
 @app.get("/api/admin/reports/range")
 def get_range_report(
@@ -1067,8 +1304,8 @@ def get_range_report(
     db: Session = Depends(get_db)
 ):
     """Get activity report for custom date range"""
-    start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-    end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    start_datetime = _day_start(_parse_date(start_date))
+    end_datetime = _day_start(_parse_date(end_date)) + timedelta(days=1)
 
     # Get summary statistics
     total_heartbeats = db.query(EmployeeHeartbeat).filter(
@@ -1086,48 +1323,48 @@ def get_range_report(
         EmployeeHeartbeat.timestamp < end_datetime
     ).distinct().count()
 
-    # Get per-employee breakdown
-    employees_with_activity = db.query(EmployeeHeartbeat.username).filter(
+    # Get per-employee breakdown; first/last/count come straight from SQL
+    activity = db.query(
+        EmployeeHeartbeat.username,
+        func.min(EmployeeHeartbeat.timestamp),
+        func.max(EmployeeHeartbeat.timestamp),
+        func.count(EmployeeHeartbeat.id)
+    ).filter(
         EmployeeHeartbeat.timestamp >= start_datetime,
         EmployeeHeartbeat.timestamp < end_datetime
-    ).distinct().all()
-
-    employee_data = []
+    ).group_by(EmployeeHeartbeat.username).order_by(EmployeeHeartbeat.username).all()
 
-    for (username,) in employees_with_activity:
-        heartbeats = db.query(EmployeeHeartbeat).filter(
-            EmployeeHeartbeat.username == username,
-            EmployeeHeartbeat.timestamp >= start_datetime,
-            EmployeeHeartbeat.timestamp < end_datetime
-        ).order_by(EmployeeHeartbeat.timestamp).all()
-
-        logs_count = db.query(EmployeeLog).filter(
-            EmployeeLog.username == username,
-            EmployeeLog.timestamp >= start_datetime,
-            EmployeeLog.timestamp < end_datetime
-        ).count()
-
-        if heartbeats:
-            first_activity = heartbeats[0].timestamp
-            last_activity = heartbeats[-1].timestamp
+    logs_counts = dict(db.query(EmployeeLog.username, func.count(EmployeeLog.id)).filter(
+        EmployeeLog.timestamp >= start_datetime,
+        EmployeeLog.timestamp < end_datetime
+    ).group_by(EmployeeLog.username).all())
 
-            # Calculate total active time (sum of gaps < 15 minutes)
-            active_time = 0
-            for i in range(len(heartbeats) - 1):
-                gap = (heartbeats[i + 1].timestamp - heartbeats[i].timestamp).total_seconds()
-                if gap <= 900:  # 15 minutes or less
-                    active_time += gap
-
-            employee_data.append({
-                "username": username,
-                "heartbeats_count": len(heartbeats),
-                "logs_count": logs_count,
-                "estimated_active_hours": round(active_time / 3600, 2),
-                "first_activity": first_activity,
-                "last_activity": last_activity
-            })
+    # Active time still needs the gaps, so only the timestamp column is loaded
+    active_time = {}
+    previous_user, previous_ts = None, None
+    for username, ts in db.query(EmployeeHeartbeat.username, EmployeeHeartbeat.timestamp).filter(
+        EmployeeHeartbeat.timestamp >= start_datetime,
+        EmployeeHeartbeat.timestamp < end_datetime
+    ).order_by(EmployeeHeartbeat.username, EmployeeHeartbeat.timestamp):
+        if username == previous_user:
+            gap = (ts - previous_ts).total_seconds()
+            if gap <= 900:  # 15 minutes or less
+                active_time[username] = active_time.get(username, 0) + gap
+        previous_user, previous_ts = username, ts
+
+    employee_data = [
+        {
+            "username": username,
+            "heartbeats_count": heartbeats_count,
+            "logs_count": logs_counts.get(username, 0),
+            "estimated_active_hours": round(active_time.get(username, 0) / 3600, 2),
+            "first_activity": first_activity,
+            "last_activity": last_activity
+        }
+        for username, first_activity, last_activity, heartbeats_count in activity
+    ]
 
-    return {
+    return ORJSONResponse({
         "start_date": start_date,
         "end_date": end_date,
         "duration_days": (end_datetime - start_datetime).days,
@@ -1137,7 +1374,7 @@ def get_range_report(
             "unique_employees": unique_employees
         },
         "employees": employee_data
-    }
+    })
 
 # Test endpoint for debugging
 @app.get("/api/download/test")
@@ -1146,13 +1383,20 @@ def test_download():
 
 # Screenshot serving endpoint
 @app.get("/api/screenshots/{filename}")
-def serve_screenshot(filename: str):
+def serve_screenshot(filename: str, expires: Optional[str] = None, sig: Optional[str] = None):
     """Serve screenshot files"""
+    if not verify_screenshot_signature(filename, expires, sig):
+        raise HTTPException(status_code=403, detail="Invalid or expired screenshot link")
     try:
         screenshot_path = os.path.join(screenshots_dir, filename)
         if os.path.exists(screenshot_path):
-            from fastapi.responses import FileResponse
-            return FileResponse(screenshot_path, media_type="image/png")
+            # Stored screenshots are .png, .jpg or .webp
+            media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            headers = {"X-Content-Type-Options": "nosniff", "Content-Encoding": "identity"}
+            if SCREENSHOTS_ACCEL_PREFIX:
+                return Response(headers={**headers, "X-Accel-Redirect": f"{SCREENSHOTS_ACCEL_PREFIX}{filename}"},
+                                media_type=media_type)
+            return FileResponse(screenshot_path, media_type=media_type, headers=headers)
         else:
             raise HTTPException(status_code=404, detail="Screenshot not found")
     except Exception as e:
@@ -1160,34 +1404,45 @@ def serve_screenshot(filename: str):
         raise HTTPException(status_code=500, detail="Error serving screenshot")
 
 # Agent download endpoints
-@app.get("/api/download/agent/{platform}")
-def download_agent(platform: str, admin=Depends(verify_admin_token)):
-    """Download agent installer for specified platform"""
-    import zipfile
-    import io
-
-    if platform not in ['windows', 'mac', 'linux']:
-        raise HTTPException(status_code=400, detail="Invalid platform")
-
-    # Create agent installer package in memory
-    zip_buffer = io.BytesIO()
+class _ZipStream:
+    """Write-only file object that collects ZipFile output for a generator to drain"""
+
+    def __init__(self):
+        self._chunks = deque()
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        while self._chunks:
+            yield self._chunks.popleft()
+
+# Members smaller than this (READMEs, install scripts) are stored as-is;
+# deflating a kilobyte or two saves little and still costs a compressor per member
+_ZIP_STORE_BELOW = 4096
+
+def _stream_zip(entries):
+    """Yield a ZIP of (name, text) entries as each member is compressed"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w') as zip_file:
+        for name, content in entries:
+            if len(content) < _ZIP_STORE_BELOW:
+                zip_file.writestr(name, content, compress_type=zipfile.ZIP_STORED)
+            else:
+                zip_file.writestr(name, content, compress_type=zipfile.ZIP_DEFLATED, compresslevel=3)
+            yield from stream.drain()
+    yield from stream.drain()
 
-    try:
-        # Read agent file content
-        agent_paths = ['../agent/agent.py', 'agent/agent.py', './agent/agent.py']
-        agent_content = None
+# Server URL baked into downloaded agents and their READMEs
+AGENT_SERVER_URL = "https://e1cdd19c-fdf6-4b9f-94bf-b122742d048e-00-2ltrq5fmw548e.riker.replit.dev"
 
-        for path in agent_paths:
-            try:
-                with open(path, 'r') as f:
-                    agent_content = f.read()
-                break
-            except FileNotFoundError:
-                continue
-
-        if not agent_content:
-            # Create a basic agent if file not found
-            agent_content = '''#!/usr/bin/env python3
+# Minimal agent, requirements and service wrapper shipped when the agent
+# sources are not deployed next to the server
+_FALLBACK_AGENT = '''#!/usr/bin/env python3
 """
 WFH Employee Monitoring Agent
 Basic version - Update SERVER_URL and AUTH_TOKEN before use
@@ -1227,181 +1482,13 @@ if __name__ == "__main__":
         time.sleep(300)  # 5 minutes
 '''
 
-        # Update server URL in agent content with current deployment URL
-        repl_id = os.getenv("REPL_ID", "")
-        repl_slug = os.getenv("REPL_SLUG", "")
-
-        # Try to get the current server URL from the request
-        current_url = "https://e1cdd19c-fdf6-4b9f-94bf-b122742d048e-00-2ltrq5fmw548e.riker.replit.dev"
-
-        # Replace the placeholder URL with the actual server URL
-        agent_content = agent_content.replace(
-            'SERVER_URL = "https://your-repl-name.replit.app"',
-            f'SERVER_URL = "{current_url}"'
-        )
-
-        # Read requirements file content
-        requirements_paths = ['../agent/agent_requirements.txt', 'agent/agent_requirements.txt', './agent/agent_requirements.txt']
-        requirements_content = None
-
-        for path in requirements_paths:
-            try:
-                with open(path, 'r') as f:
-                    requirements_content = f.read()
-                break
-            except FileNotFoundError:
-                continue
-
-        if not requirements_content:
-            # Create basic requirements if file not found
-            requirements_content = """requests>=2.31.0
+_FALLBACK_REQUIREMENTS = """requests>=2.31.0
 schedule>=1.2.0
 Pillow>=10.0.0
 psutil>=5.9.0
 """
 
-        # Create ZIP file with all content
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            zip_file.writestr('agent.py', agent_content)
-            zip_file.writestr('agent_requirements.txt', requirements_content)
-
-            # Add platform-specific instructions
-            # Use the actual server URL from the agent content for the README
-            server_url = current_url
-
-            if platform == 'windows':
-                instructions = f"""
-# WFH Monitoring Agent v2.0
-
-## Server Connection
-Server URL: {server_url}
-Agent Token: Embedded in configuration
-
-## Quick Start
-
-### Windows:
-1. Extract this ZIP file to a folder (e.g., C:\\wfh-agent\\)
-2. Open Command Prompt as Administrator in that folder
-3. Run: install.bat (for basic installation)
-4. For service installation: install_service_windows.bat
-
-### Linux:
-1. Extract this ZIP file: unzip agent.zip
-2. Make script executable: chmod +x install_service_linux.sh  
-3. Run installer: ./install_service_linux.sh
-
-### macOS:
-1. Extract this ZIP file
-2. Make script executable: chmod +x install_service_mac.sh
-3. Run installer: ./install_service_mac.sh
-
-## Manual Installation
-If automatic installation fails:
-
-1. Install Python 3.8+ if not already installed
-2. Install dependencies: pip install -r agent_requirements.txt
-3. Test connection: python agent.py --test
-4. Run agent: python agent.py
-
-## Files Included
-- agent.py - Main monitoring script
-- config.json - Pre-configured server settings
-- agent_requirements.txt - Python dependencies
-- install.bat - Basic Windows installer
-- install_service_windows.bat - Windows service installer
-- service_wrapper.py - Windows service wrapper
-- README.txt - This file
-
-## Configuration
-- The agent is pre-configured for your server
-- Configuration file: config.json
-- Logs are written to: logs/agent.log
-
-## Service Management
-"""
-                zip_file.writestr('README.txt', instructions)
-
-                # Basic Windows installation script
-                windows_script = f'''@echo off
-echo Installing WFH Monitoring Agent for Windows...
-echo.
-
-echo Step 1: Installing Python dependencies...
-pip install -r agent_requirements.txt
-if %ERRORLEVEL% NEQ 0 (
-    echo Failed to install Python dependencies
-    pause
-    exit /b 1
-)
-
-echo.
-echo Step 2: Testing agent connection...
-python agent.py --test
-if %ERRORLEVEL% NEQ 0 (
-    echo Failed to connect to server. Please check your configuration.
-    pause
-    exit /b 1
-)
-
-echo.
-echo Installation completed successfully!
-echo You can now run the agent with: python agent.py
-echo.
-echo For Windows Service installation, run: install_service_windows.bat
-pause
-'''
-                zip_file.writestr('install.bat', windows_script)
-
-                # Add Windows service installer
-                service_installer = """@echo off
-echo Installing WFH Agent as Windows Service...
-echo This requires Administrator privileges.
-echo.
-
-REM Check if running as administrator
-net session >nul 2>&1
-if %errorLevel% == 0 (
-    echo Administrator privileges confirmed.
-) else (
-    echo ERROR: This script requires Administrator privileges.
-    echo Please run as Administrator.
-    pause
-    exit /b 1
-)
-
-echo.
-echo Installing Python dependencies...
-pip install -r agent_requirements.txt
-pip install pywin32
-
-echo.
-echo Installing service...
-python service_wrapper.py install
-
-echo.
-echo Starting WFH Agent service...
-python service_wrapper.py start
-
-echo.
-echo WFH Agent service installed and started successfully.
-echo Service will start automatically on system boot.
-echo.
-echo To manage the service:
-echo   Start:   python service_wrapper.py start
-echo   Stop:    python service_wrapper.py stop
-echo   Remove:  python service_wrapper.py remove
-pause
-"""
-                zip_file.writestr('install_service_windows.bat', service_installer)
-
-                # Add service wrapper
-                try:
-                    with open('../agent/service_wrapper.py', 'r') as f:
-                        service_wrapper_content = f.read()
-                    zip_file.writestr('service_wrapper.py', service_wrapper_content)
-                except FileNotFoundError:
-                    # Create basic service wrapper if file not found
-                    service_wrapper_content = '''#!/usr/bin/env python3
+_FALLBACK_SERVICE_WRAPPER = '''#!/usr/bin/env python3
 """
 Windows Service Wrapper for WFH Agent
 """
@@ -1476,15 +1563,14 @@ if __name__ == '__main__':
     else:
         win32serviceutil.HandleCommandLine(WFHAgentService)
 '''
-                    zip_file.writestr('service_wrapper.py', service_wrapper_content)
 
-            elif platform == 'mac':
-                # Create comprehensive README with installation instructions
-                instructions = f"""
+# Installer files shipped with the agent; identical on every download, so
+# they are rendered and encoded once at import
+_AGENT_README = f"""
 # WFH Monitoring Agent v2.0
 
 ## Server Connection
-Server URL: {server_url}
+Server URL: {AGENT_SERVER_URL}
 Agent Token: Embedded in configuration
 
 ## Quick Start
@@ -1529,78 +1615,90 @@ If automatic installation fails:
 
 ## Service Management
 """
-                zip_file.writestr('README.txt', instructions)
 
-                # macOS installation script
-                mac_script = """#!/bin/bash
-echo "Installing WFH Monitoring Agent for macOS..."
-echo
-
-echo "Step 1: Installing Python dependencies..."
-pip3 install -r agent_requirements.txt
+_WINDOWS_INSTALL_SCRIPT = f'''@echo off
+echo Installing WFH Monitoring Agent for Windows...
+echo.
 
-echo
-echo "Step 2: Agent ready to run..."
-echo "Run: python3 agent.py"
-echo "To run in background: nohup python3 agent.py > agent.log 2>&1 &"
-"""
-                zip_file.writestr('install_service_mac.sh', mac_script) # Renamed for consistency
+echo Step 1: Installing Python dependencies...
+pip install -r agent_requirements.txt
+if %ERRORLEVEL% NEQ 0 (
+    echo Failed to install Python dependencies
+    pause
+    exit /b 1
+)
 
-            elif platform == 'linux':
-                # Create comprehensive README with installation instructions
-                instructions = f"""
-# WFH Monitoring Agent v2.0
+echo.
+echo Step 2: Testing agent connection...
+python agent.py --test
+if %ERRORLEVEL% NEQ 0 (
+    echo Failed to connect to server. Please check your configuration.
+    pause
+    exit /b 1
+)
 
-## Server Connection
-Server URL: {server_url}
-Agent Token: Embedded in configuration
+echo.
+echo Installation completed successfully!
+echo You can now run the agent with: python agent.py
+echo.
+echo For Windows Service installation, run: install_service_windows.bat
+pause
+'''
 
-## Quick Start
+_WINDOWS_SERVICE_INSTALLER = """@echo off
+echo Installing WFH Agent as Windows Service...
+echo This requires Administrator privileges.
+echo.
 
-### Windows:
-1. Extract this ZIP file to a folder (e.g., C:\\wfh-agent\\)
-2. Open Command Prompt as Administrator in that folder
-3. Run: install.bat (for basic installation)
-4. For service installation: install_service_windows.bat
+REM Check if running as administrator
+net session >nul 2>&1
+if %errorLevel% == 0 (
+    echo Administrator privileges confirmed.
+) else (
+    echo ERROR: This script requires Administrator privileges.
+    echo Please run as Administrator.
+    pause
+    exit /b 1
+)
 
-### Linux:
-1. Extract this ZIP file: unzip agent.zip
-2. Make script executable: chmod +x install_service_linux.sh  
-3. Run installer: ./install_service_linux.sh
+echo.
+echo Installing Python dependencies...
+pip install -r agent_requirements.txt
+pip install pywin32
 
-### macOS:
-1. Extract this ZIP file
-2. Make script executable: chmod +x install_service_mac.sh
-3. Run installer: ./install_service_mac.sh
+echo.
+echo Installing service...
+python service_wrapper.py install
 
-## Manual Installation
-If automatic installation fails:
+echo.
+echo Starting WFH Agent service...
+python service_wrapper.py start
 
-1. Install Python 3.8+ if not already installed
-2. Install dependencies: pip install -r agent_requirements.txt
-3. Test connection: python agent.py --test
-4. Run agent: python agent.py
+echo.
+echo WFH Agent service installed and started successfully.
+echo Service will start automatically on system boot.
+echo.
+echo To manage the service:
+echo   Start:   python service_wrapper.py start
+echo   Stop:    python service_wrapper.py stop
+echo   Remove:  python service_wrapper.py remove
+pause
+"""
 
-## Files Included
-- agent.py - Main monitoring script
-- config.json - Pre-configured server settings
-- agent_requirements.txt - Python dependencies
-- install.bat - Basic Windows installer
-- install_service_windows.bat - Windows service installer
-- service_wrapper.py - Windows service wrapper
-- README.txt - This file
+_MAC_INSTALL_SCRIPT = """#!/bin/bash
+echo "Installing WFH Monitoring Agent for macOS..."
+echo
 
-## Configuration
-- The agent is pre-configured for your server
-- Configuration file: config.json
-- Logs are written to: logs/agent.log
+echo "Step 1: Installing Python dependencies..."
+pip3 install -r agent_requirements.txt
 
-## Service Management
+echo
+echo "Step 2: Agent ready to run..."
+echo "Run: python3 agent.py"
+echo "To run in background: nohup python3 agent.py > agent.log 2>&1 &"
 """
-                zip_file.writestr('README.txt', instructions)
 
-                # Linux installation script
-                linux_script = """#!/bin/bash
+_LINUX_INSTALL_SCRIPT = """#!/bin/bash
 echo "Installing WFH Monitoring Agent for Linux..."
 echo
 
@@ -1612,18 +1710,114 @@ echo "Step 2: Agent ready to run..."
 echo "Run: python3 agent.py"
 echo "To run in background: nohup python3 agent.py > agent.log 2>&1 &"
 """
-                zip_file.writestr('install_service_linux.sh', linux_script) # Renamed for consistency
 
-        zip_buffer.seek(0)
-        return StreamingResponse(
-            io.BytesIO(zip_buffer.read()),
-            media_type="application/zip",
-            headers={"Content-Disposition": f"attachment; filename=wfh-agent-{platform}.zip"}
-        )
+PLATFORM_ASSETS = {
+    'windows': [
+        ('README.txt', _AGENT_README.encode('utf-8')),
+        ('install.bat', _WINDOWS_INSTALL_SCRIPT.encode('utf-8')),
+        ('install_service_windows.bat', _WINDOWS_SERVICE_INSTALLER.encode('utf-8')),
+    ],
+    'mac': [
+        ('README.txt', _AGENT_README.encode('utf-8')),
+        ('install_service_mac.sh', _MAC_INSTALL_SCRIPT.encode('utf-8')),
+    ],
+    'linux': [
+        ('README.txt', _AGENT_README.encode('utf-8')),
+        ('install_service_linux.sh', _LINUX_INSTALL_SCRIPT.encode('utf-8')),
+    ],
+}
+
+def _read_agent_file(paths):
+    """Contents of the first of `paths` that exists, or None"""
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            continue
+    return None
+
+def _agent_package_entries(platform: str):
+    """(name, content) members of the agent installer zip for one platform"""
+    # The agent reads its server URL from config; only the fallback embeds AGENT_SERVER_URL
+    agent_content = _read_agent_file(['../agent/agent.py', 'agent/agent.py', './agent/agent.py']) or _FALLBACK_AGENT
+    requirements_content = _read_agent_file(
+        ['../agent/agent_requirements.txt', 'agent/agent_requirements.txt', './agent/agent_requirements.txt']
+    ) or _FALLBACK_REQUIREMENTS
+
+    entries = [('agent.py', agent_content), ('agent_requirements.txt', requirements_content)]
+    entries.extend(PLATFORM_ASSETS[platform])
+    if platform == 'windows':
+        service_wrapper_content = _read_agent_file(['../agent/service_wrapper.py']) or _FALLBACK_SERVICE_WRAPPER
+        entries.append(('service_wrapper.py', service_wrapper_content))
+    return entries
+
+# Agent source files whose changes invalidate the cached packages
+_AGENT_SOURCE_FILES = [
+    '../agent/agent.py', 'agent/agent.py', './agent/agent.py',
+    '../agent/agent_requirements.txt', 'agent/agent_requirements.txt', './agent/agent_requirements.txt',
+    '../agent/service_wrapper.py',
+]
+
+def _agent_sources_version():
+    """mtimes of the agent source files, used as part of the package cache key"""
+    version = []
+    for path in _AGENT_SOURCE_FILES:
+        try:
+            version.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+# platform -> (sources version, zip bytes, ETag); a hit is served without leaving the event loop
+_agent_packages = {}
+
+def _agent_package(platform: str):
+    """Built zip bytes and ETag for a platform; reads files and compresses, so run it off the loop"""
+    package = b"".join(_stream_zip(_agent_package_entries(platform)))
+    return package, f'"{hashlib.md5(package).hexdigest()}"'
+
+# Prebuilt installers published by the release pipeline, e.g.
+# AGENT_ARTIFACT_URL="https://cdn.example.com/wfh-agent/1.4.0/wfh-agent-{platform}.{ext}".
+# When set, downloads redirect there instead of zipping the agent scripts here.
+AGENT_ARTIFACT_URL = os.getenv("AGENT_ARTIFACT_URL", "")
+AGENT_ARTIFACT_EXTENSIONS = {'windows': 'msi', 'mac': 'pkg', 'linux': 'deb'}
+
+@app.post("/api/admin/download-token")
+async def issue_download_token(admin=Depends(verify_admin_token)):
+    """Short-lived, single-use token for a direct agent download link"""
+    return {"token": create_download_token(admin), "expires_in": DOWNLOAD_TOKEN_EXPIRE_SECONDS}
 
-    except Exception as e:
-        print(f"Error creating agent package: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to create agent package: {str(e)}")
+@app.get("/api/download/agent/{platform}")
+async def download_agent(platform: str, request: Request, admin=Depends(verify_download_access)):
+    """Download agent installer for specified platform"""
+    if platform not in ['windows', 'mac', 'linux']:
+        raise HTTPException(status_code=400, detail="Invalid platform")
+
+    if AGENT_ARTIFACT_URL:
+        url = AGENT_ARTIFACT_URL.format(platform=platform, ext=AGENT_ARTIFACT_EXTENSIONS[platform])
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": "no-store"})
+
+    # Rebuilt when the agent sources change; concurrent misses may both build, which is harmless
+    sources_version = _agent_sources_version()
+    cached = _agent_packages.get(platform)
+    if cached is not None and cached[0] == sources_version:
+        _, package, etag = cached
+    else:
+        try:
+            package, etag = await run_in_threadpool(_agent_package, platform)
+        except Exception as e:
+            print(f"Error creating agent package: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to create agent package: {str(e)}")
+        _agent_packages[platform] = (sources_version, package, etag)
+
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=300"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f"attachment; filename=wfh-agent-{platform}.zip"
+    # Already compressed; an explicit identity encoding keeps GZipMiddleware off it
+    headers["Content-Encoding"] = "identity"
+    return Response(content=package, media_type="application/zip", headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,130 @@
+"""
+Small TTL caches for admin dashboard responses.
+In-process by default; shared through Redis when REDIS_URL is set, so every
+worker serves the same cached payload.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+
+
+class TTLCache:
+    """Thread-safe key/value cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def add(self, key: str, value: Any) -> bool:
+        """Store value only if key is absent or expired; True if it was stored"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            return True
+
+    def invalidate(self, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+
+class RedisTTLCache:
+    """TTLCache interface backed by Redis; values are stored as orjson bytes"""
+
+    def __init__(self, client, ttl: float, prefix: str = "wfh:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            cached = self.client.get(self.prefix + key)
+        except Exception as e:
+            print(f"Redis cache get failed: {e}")
+            return None
+        return orjson.loads(cached) if cached is not None else None
+
+    def set(self, key: str, value: Any):
+        try:
+            self.client.set(self.prefix + key, orjson.dumps(value), px=int(self.ttl * 1000))
+        except Exception as e:
+            print(f"Redis cache set failed: {e}")
+
+    def add(self, key: str, value: Any) -> bool:
+        try:
+            return bool(self.client.set(self.prefix + key, orjson.dumps(value), px=int(self.ttl * 1000), nx=True))
+        except Exception as e:
+            # Callers use add() to claim one-time keys, so fail closed
+            print(f"Redis cache add failed: {e}")
+            return False
+
+    def invalidate(self, key: Optional[str] = None):
+        try:
+            if key is not None:
+                self.client.delete(self.prefix + key)
+            else:
+                keys = list(self.client.scan_iter(match=self.prefix + "*"))
+                if keys:
+                    self.client.delete(*keys)
+        except Exception as e:
+            print(f"Redis cache invalidate failed: {e}")
+
+
+def make_cache(ttl: float, prefix: str = "wfh:"):
+    """Redis-backed cache when REDIS_URL is set and redis is installed, else in-process"""
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        try:
+            import redis
+            return RedisTTLCache(redis.Redis.from_url(redis_url, socket_timeout=0.5), ttl, prefix)
+        except ImportError:
+            print("Warning: REDIS_URL is set but the redis package is not installed; using in-process cache")
+    return TTLCache(ttl)
+
+
+_compute_locks: Dict[str, threading.Lock] = {}
+_compute_locks_guard = threading.Lock()
+
+
+def get_or_compute(cache, key: str, compute: Callable[[], Any]) -> Any:
+    """Cached value for key; when many requests miss at once, only one computes it"""
+    value = cache.get(key)
+    if value is not None:
+        return value
+    with _compute_locks_guard:
+        lock = _compute_locks.setdefault(key, threading.Lock())
+    with lock:
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value)
+    return value
+
+
+# Employee status is polled by every open dashboard
+STATUS_CACHE_TTL = 5
+status_cache = make_cache(STATUS_CACHE_TTL)
@@ -0,0 +1,150 @@
+"""
+Pushes employee online/offline changes to connected admin dashboards.
+Presence is re-read after each heartbeat flush and at least every
+SWEEP_INTERVAL seconds, but only while a dashboard is listening; only
+employees whose status changed are sent.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+import orjson
+from fastapi import WebSocket
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal, EmployeePresence
+from response_cache import status_cache
+
+# Offline transitions are noticed on the next sweep after the 10-minute window lapses
+SWEEP_INTERVAL = float(os.getenv("STATUS_SWEEP_INTERVAL", "30"))
+ONLINE_WINDOW = timedelta(minutes=10)
+# A dashboard that can't take a push within this many seconds is disconnected
+SEND_TIMEOUT = float(os.getenv("STATUS_SEND_TIMEOUT", "5"))
+
+_clients: Set[WebSocket] = set()
+_snapshot: Dict[str, bool] = {}
+# Set when the first dashboard connects; the next sweep only records a baseline
+_priming = False
+_wake: Optional[asyncio.Event] = None
+_sweep_task: Optional[asyncio.Task] = None
+
+
+def _load_presence():
+    cutoff = datetime.utcnow() - ONLINE_WINDOW
+    with SessionLocal() as db:
+        return db.execute(select(
+            EmployeePresence.username,
+            EmployeePresence.last_seen,
+            (EmployeePresence.last_seen > cutoff).label("is_online")
+        )).all()
+
+
+async def _send_one(websocket: WebSocket, text: str):
+    try:
+        await asyncio.wait_for(websocket.send_text(text), SEND_TIMEOUT)
+    except Exception:
+        # Slow or dead dashboards are dropped; they reconnect and reload over HTTP
+        _clients.discard(websocket)
+        try:
+            await asyncio.wait_for(websocket.close(), SEND_TIMEOUT)
+        except Exception:
+            pass
+
+
+async def _send_all(message: bytes):
+    text = message.decode("utf-8")
+    await asyncio.gather(*(_send_one(websocket, text) for websocket in list(_clients)))
+
+
+async def _sweep():
+    global _priming
+    rows = await run_in_threadpool(_load_presence)
+    priming, _priming = _priming, False
+    changed = []
+    for row in rows:
+        is_online = bool(row.is_online)
+        if _snapshot.get(row.username) != is_online:
+            _snapshot[row.username] = is_online
+            changed.append(row)
+    # The first sweep after a dashboard connects only records the baseline;
+    # the dashboard loaded the same state over HTTP
+    if priming or not changed:
+        return
+
+    # Dashboards refetch stats after a push; don't hand them the pre-change payload.
+    # The Redis backend is a blocking client, so keep it off the event loop
+    await run_in_threadpool(status_cache.invalidate)
+
+    total = len(_snapshot)
+    online = sum(_snapshot.values())
+    for row in changed:
+        await _send_all(orjson.dumps({
+            "type": "status",
+            "username": row.username,
+            "status": "online" if row.is_online else "offline",
+            "last_seen": row.last_seen,
+            "total": total,
+            "online": online,
+        }))
+
+
+async def _sweep_loop():
+    while True:
+        try:
+            await asyncio.wait_for(_wake.wait(), SWEEP_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        if not _clients:
+            _snapshot.clear()
+            continue
+        try:
+            await _sweep()
+        except Exception as e:
+            print(f"Error sweeping employee status: {e}")
+
+
+def notify():
+    """Ask for a sweep soon, e.g. after new heartbeats were written"""
+    if _wake is not None and _clients:
+        _wake.set()
+
+
+def connect(websocket: WebSocket):
+    global _priming
+    first = not _clients
+    _clients.add(websocket)
+    if first:
+        _priming = True
+        notify()
+
+
+def disconnect(websocket: WebSocket):
+    _clients.discard(websocket)
+
+
+async def start():
+    global _wake, _sweep_task
+    _wake = asyncio.Event()
+    _sweep_task = asyncio.create_task(_sweep_loop())
+
+
+async def stop():
+    global _sweep_task
+    if _sweep_task is None:
+        return
+    _sweep_task.cancel()
+    try:
+        await _sweep_task
+    except asyncio.CancelledError:
+        pass
+    _sweep_task = None
+    for websocket in list(_clients):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+    _clients.clear()